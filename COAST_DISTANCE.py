@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+This module is part of the IH-STORM model
+
+For more information, please see
+Bloemendaal, N., Haigh, I.D., de Moel, H. et al.
+Generation of a global synthetic tropical cyclone hazard dataset using STORM.
+Sci Data 7, 40 (2020). https://doi.org/10.1038/s41597-020-0381-2
+
+This is the STORM module for the distance to the coast. The distance is precomputed once per
+basin on the 0.1 deg grid of the land-sea mask and stored as DISTANCE_TO_COAST_<basin>.npy,
+so the distance of a whole track is found with one array lookup.
+
+Released under the GNU General Public License v3.0
+"""
+import numpy as np
+from scipy import spatial
+import os
+import sys
+dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
+__location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
+
+from SELECT_BASIN import Basin_boundaries
+
+def distance_to_coast_raster(basin,path=__location__,degree_in_km=111.12):
+    """
+    Distance to the coast on the 0.1 deg grid of the land-sea mask. Row y and column x of the
+    raster correspond to lat=lat1-0.1*y and lon=lon0+0.1*x. The raster is calculated the first time
+    and loaded from DISTANCE_TO_COAST_<basin>.npy afterwards (it is recalculated if coastal_basemap_data.npy is newer).
+
+    Parameters
+    ----------
+    basin : basin.
+    path : directory with coastal_basemap_data.npy.
+    degree_in_km : The default is 111.12.
+
+    Returns
+    -------
+    raster : distance to coast in km.
+
+    """
+    fname=os.path.join(path,'DISTANCE_TO_COAST_'+str(basin)+'.npy')
+    fcoast=os.path.join(path,'coastal_basemap_data.npy')
+
+    if os.path.exists(fname) and os.path.getmtime(fname)>=os.path.getmtime(fcoast):
+        return np.load(fname)
+
+    lat0,lat1,lon0,lon1=Basin_boundaries(basin)
+
+    D=np.load(fcoast,encoding='latin1',allow_pickle=True).tolist()
+    tree=spatial.cKDTree(np.column_stack((D['lons'],D['lats'])))
+
+    lats=lat1-0.1*np.arange(0,int(10*(lat1-lat0)))
+    lons=lon0+0.1*np.arange(0,int(10*(lon1-lon0)))
+    lons[lons>180]=lons[lons>180]-360. #the coastal points range from -180 to 180 deg
+
+    lon_grid,lat_grid=np.meshgrid(lons,lats)
+    dists,dummy=tree.query(np.column_stack((lon_grid.ravel(),lat_grid.ravel())))
+    raster=np.reshape(dists*degree_in_km,lon_grid.shape)
+
+    #write to a temporary file first, so other processes never load a half-written raster
+    tmp=fname+'.'+str(os.getpid())+'.tmp'
+    with open(tmp,'wb') as f:
+        np.save(f,raster)
+    os.replace(tmp,fname)
+    return raster
+
+def distance_from_coast_track(lon,lat,lat1,lon0,raster):
+    """
+    Distance to the coast of all points of a track
+
+    Parameters
+    ----------
+    lon : array of longitude positions of TC.
+    lat : array of latitude positions of TC.
+    lat1 : upper left corner latitude coordinate of basin.
+    lon0 : upper left corner longitude coordinate of basin.
+    raster : distance to coast raster (see distance_to_coast_raster).
+
+    Returns
+    -------
+    distance : array of distances to coast in km.
+
+    """
+    y=np.clip(np.rint(10*(lat1-np.asarray(lat,dtype=float))).astype(int),0,raster.shape[0]-1)
+    x=np.clip(np.rint(10*(np.asarray(lon,dtype=float)-lon0)).astype(int),0,raster.shape[1]-1)
+    return raster[y,x]
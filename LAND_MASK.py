@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+This module is part of the IH-STORM model
+
+For more information, please see
+Bloemendaal, N., Haigh, I.D., de Moel, H. et al.
+Generation of a global synthetic tropical cyclone hazard dataset using STORM.
+Sci Data 7, 40 (2020). https://doi.org/10.1038/s41597-020-0381-2
+
+This is the STORM module for the land-sea mask. The 0.1 deg mask of a basin (Land_ocean_mask_<basin>.txt)
+is read once and stored with 1 bit per cell in LAND_MASK_<basin>.npy. The packed mask is memory-mapped,
+so the worker processes share the same pages instead of holding a float copy of the mask each.
+
+Released under the GNU General Public License v3.0
+"""
+import numpy as np
+import os
+import sys
+dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
+__location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
+
+from SELECT_BASIN import Basin_boundaries
+from TEXT_CACHE import load_text,cache_names
+
+def packed_land_mask(basin,path=__location__):
+    """
+    Bit-packed land-sea mask of a basin. Every row of the mask is packed into bytes with np.packbits (first
+    column in the highest bit). The packed mask is written to LAND_MASK_<basin>.npy the first time and
+    memory-mapped afterwards. The text mask is read through TEXT_CACHE.load_text, and the packed mask is
+    rewritten when the cache of the text mask is newer (i.e. when the text mask changed).
+
+    Parameters
+    ----------
+    basin : basin.
+    path : directory with Land_ocean_mask_<basin>.txt.
+
+    Returns
+    -------
+    packed : packed mask (uint8), shape (rows, ceil(columns/8)).
+    ncol : number of columns of the mask.
+
+    """
+    fname=os.path.join(path,'LAND_MASK_'+str(basin)+'.npy')
+    ftxt=os.path.join(path,'Land_ocean_mask_'+str(basin)+'.txt')
+
+    land_mask=load_text(ftxt,ndmin=2)
+    fcache=cache_names(ftxt)[0]
+
+    if not (os.path.exists(fname) and os.path.exists(fcache) and os.path.getmtime(fname)>=os.path.getmtime(fcache)):
+        packed=np.packbits(land_mask>0,axis=1)
+        #write to a temporary file first, so other processes never map a half-written mask
+        tmp=fname+'.'+str(os.getpid())+'.tmp'
+        with open(tmp,'wb') as f:
+            np.save(f,packed)
+        os.replace(tmp,fname)
+
+    #the number of columns is not a function of the basin boundaries (see Make_land_ocean_mask.py), so it is returned as well
+    return np.load(fname,mmap_mode='r'),land_mask.shape[1]
+
+class LandMask:
+    """
+    Memory-mapped, bit-packed land-sea mask of a basin. It is indexed like the float mask of
+    np.loadtxt: land_mask[y,x] returns 1. (land) or 0. (sea) for integer indices or index arrays.
+
+    Parameters
+    ----------
+    basin : basin.
+    path : directory with Land_ocean_mask_<basin>.txt.
+
+    """
+    def __init__(self,basin,path=__location__):
+        self.basin=basin
+        self.lat0,self.lat1,self.lon0,self.lon1=Basin_boundaries(basin)
+        self.packed,ncol=packed_land_mask(basin,path)
+        self.shape=(self.packed.shape[0],ncol)
+
+    def __getitem__(self,index):
+        y,x=index
+        nrow,ncol=self.shape
+        if isinstance(y,(int,np.integer)) and isinstance(x,(int,np.integer)): #single position (Check_if_landfall)
+            if not (-nrow<=y<nrow and -ncol<=x<ncol):
+                raise IndexError('index out of bounds for land mask of shape '+str(self.shape))
+            x=int(x)%ncol
+            return np.float64((int(self.packed[y,x>>3])>>(7-(x&7)))&1)
+        y=np.asarray(y)
+        x=np.asarray(x)
+        if np.any((y>=nrow)|(y<-nrow)|(x>=ncol)|(x<-ncol)):
+            raise IndexError('index out of bounds for land mask of shape '+str(self.shape))
+        y=np.where(y<0,y+nrow,y)
+        x=np.where(x<0,x+ncol,x)
+        l=(self.packed[y,x>>3]>>(7-(x&7)))&1
+        return l.astype(float)[()]
+
+    def landfall(self,lat,lon):
+        """
+        Landfall flags of arrays of positions in the basin
+
+        Parameters
+        ----------
+        lat : array of latitude positions of TCs
+        lon : array of longitude positions of TCs
+
+        Returns
+        -------
+        l : array of landfall flags (0=no landfall, 1=landfall)
+
+        """
+        x=(10*(np.asarray(lon)-self.lon0)).astype(int)
+        y=(10*(self.lat1-np.asarray(lat))).astype(int)
+        return self[y,x]
+
+    def toarray(self):
+        """
+        The unpacked mask as a float array, as read by np.loadtxt
+        """
+        return np.unpackbits(self.packed,axis=1,count=self.shape[1]).astype(float)
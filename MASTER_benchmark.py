@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+This module is part of the IH-STORM model
+
+For more information, please see
+Bloemendaal, N., Haigh, I.D., de Moel, H. et al.
+Generation of a global synthetic tropical cyclone hazard dataset using STORM.
+Sci Data 7, 40 (2020). https://doi.org/10.1038/s41597-020-0381-2
+
+This is the STORM benchmark program. It times the simulation kernels (genesis, track, pressure,
+decay after landfall, radius to maximum winds and distance to land) on synthetic input data
+(see SYNTHETIC_INPUT.py) for several batch sizes, and saves the timings as JSON. Compare the
+results with those of an earlier benchmark to find throughput regressions.
+
+Released under the GNU General Public License v3.0
+"""
+import numpy as np
+import json
+import time
+import platform
+import os
+import sys
+dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
+__location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
+
+#Custom made modules
+from SYNTHETIC_INPUT import make_synthetic_input,synthetic_files,MONTHS
+from SIMULATION_CONTEXT import SimulationContext
+from SAMPLE_STARTING_POINT import Startingpoint
+from SAMPLE_TC_MOVEMENT import TC_movement,TC_movement_batch
+from SAMPLE_TC_PRESSURE import TC_pressure,TC_pressure_batch,decay_after_landfall
+from SAMPLE_RMAX import Add_Rmax,Add_Rmax_batch
+from COAST_DISTANCE import distance_from_coast_track
+from TRACKS import tracks_from_lists
+
+#==============================================================================
+# Benchmark settings
+#==============================================================================
+basin='WP' #basin (EP,NA,NI,SI,SP,WP)
+batch_sizes=[10,100,1000] #number of storms per call
+repeats=3 #the fastest of the repeats is reported
+seed=0 #seed of the synthetic input and the random numbers of the kernels
+input_path=os.path.join(__location__,'BENCHMARK_INPUT') #directory of the synthetic input data
+output=os.path.join(__location__,'BENCHMARK_'+basin+'.json') #benchmark results
+baseline=None #results of an earlier benchmark (JSON) to compare with, or None
+tolerance=1.2 #a kernel is reported as a regression if it is slower than tolerance*baseline
+
+def benchmark_inputs(context,basin,n,seed):
+    """
+    Input of the kernels for a batch of n storms
+
+    Parameters
+    ----------
+    context : SimulationContext of the basin.
+    basin : basin.
+    n : number of storms.
+    seed : seed of the random numbers.
+
+    Returns
+    -------
+    inputs : dictionary with genesis months and positions, tracks (as lists and as TRACKS.Tracks), pressures and landfall tracks.
+
+    """
+    rng=np.random.default_rng(seed)
+    months=rng.choice(MONTHS[basin],n).tolist()
+    lon,lat=Startingpoint(n,months,basin,context,rng)
+    latlist,lonlist,landfalllist=TC_movement_batch(lon,lat,basin,context=context,rng=rng)
+
+    #tracks over land, with steps of 0.5 deg, and pressures that deepen from 1005 to 930 hPa
+    lengths=rng.integers(10,60,n)
+    land_lat=[lat[k]+0.5*np.arange(lengths[k]) for k in range(n)]
+    land_lon=[lon[k]+0.5*np.arange(lengths[k]) for k in range(n)]
+    pressures=[np.linspace(1005.,930.,lengths[k]).tolist() for k in range(n)]
+
+    return {'months':months,'lon':lon,'lat':lat,'latlist':latlist,'lonlist':lonlist,'landfalllist':landfalllist,'tracks':tracks_from_lists(latlist,lonlist,landfalllist),
+            'land_lat':land_lat,'land_lon':land_lon,'pressures':pressures,'pressure_offsets':np.concatenate(([0],np.cumsum(lengths)))}
+
+def kernels(context,basin,inputs,n):
+    """
+    The simulation kernels, as functions of the random number generator
+
+    Parameters
+    ----------
+    context : SimulationContext of the basin.
+    basin : basin.
+    inputs : input of the kernels (see benchmark_inputs).
+    n : number of storms.
+
+    Returns
+    -------
+    kernels : dictionary with a function per kernel.
+
+    """
+    coef=context.WPR_coefficients[inputs['months'][0]]
+    raster=context.distance_to_coast()
+    return {'Startingpoint':lambda rng: Startingpoint(n,inputs['months'],basin,context,rng),
+            'TC_movement':lambda rng: TC_movement(inputs['lon'],inputs['lat'],basin,context,rng),
+            'TC_movement_batch':lambda rng: TC_movement_batch(inputs['lon'],inputs['lat'],basin,ragged=True,context=context,rng=rng),
+            'TC_pressure':lambda rng: TC_pressure(basin,inputs['latlist'],inputs['lonlist'],inputs['landfalllist'],0,n,inputs['months'],[],context,rng),
+            'TC_pressure_batch':lambda rng: TC_pressure_batch(basin,inputs['tracks'],None,None,[0]*n,inputs['months'],[],context,rng),
+            'decay_after_landfall':lambda rng: [decay_after_landfall(inputs['land_lat'][k][0],inputs['land_lon'][k][0],inputs['land_lat'][k],inputs['land_lon'][k],950.,coef,1010.) for k in range(n)],
+            'Add_Rmax':lambda rng: [Add_Rmax(pressure,context,rng) for pressure in inputs['pressures']],
+            'Add_Rmax_batch':lambda rng: Add_Rmax_batch(np.concatenate(inputs['pressures']),inputs['pressure_offsets'],context,rng),
+            'distance_from_coast':lambda rng: [distance_from_coast_track(inputs['lonlist'][k],inputs['latlist'][k],context.lat1,context.lon0,raster) for k in range(n)]}
+
+def run_benchmarks(basin,batch_sizes,repeats,path,seed=0):
+    """
+    Time the simulation kernels
+
+    Parameters
+    ----------
+    basin : basin.
+    batch_sizes : list of numbers of storms per call.
+    repeats : number of repeats, the fastest is reported.
+    path : directory of the synthetic input data.
+    seed : seed of the random numbers. The default is 0.
+
+    Returns
+    -------
+    results : list of dictionaries with kernel, batch size, time (s) and storms per second.
+
+    """
+    context=SimulationContext(basin,path)
+    results=[]
+    for n in batch_sizes:
+        inputs=benchmark_inputs(context,basin,n,seed)
+        for name,kernel in kernels(context,basin,inputs,n).items():
+            kernel(np.random.default_rng(seed)) #warm up the caches of the context
+            times=[]
+            for r in range(0,repeats):
+                rng=np.random.default_rng(seed) #every repeat draws the same random numbers
+                start=time.perf_counter()
+                kernel(rng)
+                times.append(time.perf_counter()-start)
+            results.append({'kernel':name,'batch_size':n,'seconds':min(times),'storms_per_second':n/min(times)})
+            print(name,n,'storms:',round(min(times),4),'s')
+    return results
+
+def compare_results(results,baseline,tolerance=1.2):
+    """
+    Compare benchmark results with an earlier benchmark
+
+    Parameters
+    ----------
+    results : benchmark results (see run_benchmarks).
+    baseline : results of the earlier benchmark.
+    tolerance : a kernel is a regression if it is slower than tolerance times the earlier time. The default is 1.2.
+
+    Returns
+    -------
+    regressions : list of (kernel, batch size, time, earlier time).
+
+    """
+    earlier={(result['kernel'],result['batch_size']):result['seconds'] for result in baseline}
+    regressions=[]
+    for result in results:
+        key=(result['kernel'],result['batch_size'])
+        if key in earlier and result['seconds']>tolerance*earlier[key]:
+            regressions.append((key[0],key[1],result['seconds'],earlier[key]))
+    return regressions
+
+if __name__=='__main__':
+    if not synthetic_files(input_path):
+        print('writing synthetic input data to',input_path)
+        make_synthetic_input(input_path,seed)
+
+    results=run_benchmarks(basin,batch_sizes,repeats,input_path,seed)
+
+    with open(output,'w') as f:
+        json.dump({'basin':basin,'repeats':repeats,'seed':seed,'python':platform.python_version(),'numpy':np.__version__,
+                   'machine':platform.machine(),'date':time.strftime('%Y-%m-%d %H:%M:%S'),'results':results},f,indent=1)
+    print('results saved to',output)
+
+    if baseline is not None:
+        with open(baseline,'r') as f:
+            regressions=compare_results(results,json.load(f)['results'],tolerance)
+        for name,n,seconds,earlier in regressions:
+            print('regression:',name,n,'storms:',round(seconds,4),'s, was',round(earlier,4),'s')
+        if len(regressions)==0:
+            print('no regressions compared to',baseline)
@@ -2,6 +2,7 @@ import pandas as pd
 import numpy as np
 from math import radians, cos, sin, asin, sqrt
 import geopandas as gpd
+from STORM_CATALOGUE import Catalogue
 
 #==================================================== 
 # Calculate distance                 
@@ -64,87 +65,34 @@ for nmodel in range(0,1):
     print (nmodel,GCM[nmodel])
     for basinid in range(range1,range2):
         basin=BASIN_names[basinid]
-        for index in range(0,nloop): 
-            #load the STORM datasets. Make sure the directory is set right!
-            data=np.loadtxt('STORM_DATA_'+GCM[nmodel]+'_'+str(basin)+'_1000_YEARS_'+str(index)+text_file[nmodel],delimiter=',')
-    
-            #extract necessary parameters (change the parametered you want to study)
-            time,lat,lon,wind=data[:,3],data[:,5],data[:,6],data[:,8]
-            del data
-                
-            indices=[i for i,x in enumerate(time) if x==0]
-            indices.append(len(time))
-            i=0
-            
-            #loop over all TCs in the dataset
-            while i<len(indices)-1:
-                start=indices[i]
-                end=indices[i+1]
-                
-                latslice=lat[start:end]
-                lonslice=lon[start:end]
-                windslice=wind[start:end]
-                        
-                for l in range(len(latitudes)): #for every city
-                    if basins[l]==basin:
-                        lat_loc=latitudes[l]
-                        lon_loc=longitudes[l]
-                        wind_loc=[]
-                        if lon_loc<0.:
-                            lon_loc+=360        
-                
-                        for j in range(len(latslice)):
-                            #calculate the distance between the track and the capital city
-                            distance=haversine(lonslice[j],latslice[j],lon_loc,lat_loc)
-                          
-                            if distance<=radius:
-                                wind_loc.append(windslice[j])
-                        
-                        if len(wind_loc)>0.:
-                            if np.max(wind_loc)>=18.:
-                                wind_dict[l].append(np.max(wind_loc)) #store the maximum wind speed for the TC
-                i=i+1
-                
-                   for index in range(0,nloop): 
-            #load the STORM datasets. Make sure the directory is set right!
-            data=np.loadtxt('STORM_DATA_'+GCM[nmodel]+'_'+str(basin)+'_1000_YEARS_'+str(index)+text_file[nmodel],delimiter=',')
-    
-            #extract necessary parameters (change the parametered you want to study)
-            time,lat,lon,wind=data[:,3],data[:,5],data[:,6],data[:,8]
-            del data
-                
-            indices=[i for i,x in enumerate(time) if x==0]
-            indices.append(len(time))
-            i=0
+        #open the STORM datasets lazily (memory-mapped, see STORM_CATALOGUE.py). Make sure the directory is set right!
+        catalogue=Catalogue(['STORM_DATA_'+GCM[nmodel]+'_'+str(basin)+'_1000_YEARS_'+str(index)+text_file[nmodel] for index in range(0,nloop)])
+
+        #loop over all TCs in the dataset (change the parameters you want to study)
+        for nslice,year,storm,track in catalogue.storms(['lat','lon','wind']):
+            latslice=track['lat']
+            lonslice=track['lon']
+            windslice=track['wind']
+
+            for l in range(len(latitudes)): #for every city
+                if basins[l]==basin:
+                    lat_loc=latitudes[l]
+                    lon_loc=longitudes[l]
+                    wind_loc=[]
+                    if lon_loc<0.:
+                        lon_loc+=360        
             
-            #loop over all TCs in the dataset
-            while i<len(indices)-1:
-                start=indices[i]
-                end=indices[i+1]
-                
-                latslice=lat[start:end]
-                lonslice=lon[start:end]
-                windslice=wind[start:end]
-                        
-                for l in range(len(latitudes)): #for every city
-                    if basins[l]==basin:
-                        lat_loc=latitudes[l]
-                        lon_loc=longitudes[l]
-                        wind_loc=[]
-                        if lon_loc<0.:
-                            lon_loc+=360        
-                
-                        for j in range(len(latslice)):
-                            #calculate the distance between the track and the capital city
-                            distance=haversine(lonslice[j],latslice[j],lon_loc,lat_loc)
-                          
-                            if distance<=radius:
-                                wind_loc.append(windslice[j])
-                        
-                        if len(wind_loc)>0.:
-                            if np.max(wind_loc)>=18.:
-                                wind_dict[l].append(np.max(wind_loc)) #store the maximum wind speed for the TC
-                i=i+1
+                    for j in range(len(latslice)):
+                        #calculate the distance between the track and the capital city
+                        distance=haversine(lonslice[j],latslice[j],lon_loc,lat_loc)
+                      
+                        if distance<=radius:
+                            wind_loc.append(windslice[j])
+                    
+                    if len(wind_loc)>0.:
+                        if np.max(wind_loc)>=18.:
+                            wind_dict[l].append(np.max(wind_loc)) #store the maximum wind speed for the TC
+        catalogue.close()
 
     
     #==================================================== 
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+This module is part of the IH-STORM model
+
+For more information, please see
+Bloemendaal, N., Haigh, I.D., de Moel, H. et al.
+Generation of a global synthetic tropical cyclone hazard dataset using STORM.
+Sci Data 7, 40 (2020). https://doi.org/10.1038/s41597-020-0381-2
+
+This is the STORM master program for long catalogues that are split in shards (see STORM_SHARDS.py).
+It writes the manifest, runs the shards as local processes and merges them. On a cluster, write the
+manifest with this script (run_shards=False), run 'python STORM_SHARDS.py run <manifest> <shard>' on
+the nodes and 'python STORM_SHARDS.py merge <manifest>' when all shards are finished.
+
+Released under the GNU General Public License v3.0
+"""
+
+#Custom made modules
+from STORM_SHARDS import make_manifest,write_manifest,manifest_name,run_local,merge_shards
+
+import os
+import sys
+dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
+__location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
+
+import time
+
+#==============================================================================
+# Catalogue settings
+#==============================================================================
+basins=['EP','NA','NI','SI','SP','WP'] #basins (EP,NA,NI,SI,SP,WP)
+total_years=100000 #number of years of the catalogue of every basin
+years_per_shard=10000 #number of years per shard, rounded up to whole blocks of STORM_DRIVER.BLOCK_YEARS
+seed=None #seed of the catalogue. Set an integer to reproduce a catalogue (None draws a new seed)
+output_format='txt' #'txt' or 'h5'
+max_restarts=100 #number of times a TC with an unrealistic pressure is regenerated from genesis (None for no limit)
+restart_policy='discard' #'discard' the TC or 'clamp' its pressure to the lowest realistic pressure when max_restarts is exceeded
+processes=os.cpu_count() #number of shards that run at the same time
+metrics=False #write counters and stage timers of every shard and basin
+run_shards=True #run the shards as local processes. Set to False to only write the manifest (e.g. for a cluster)
+resume='--resume' in sys.argv[1:] #continue with the existing manifest and the checkpoints of the shards: python MASTER_shards.py --resume
+
+if __name__=='__main__':
+    start_time=time.time()
+    manifest=os.path.join(__location__,manifest_name(total_years))
+    if not resume:
+        write_manifest(manifest,make_manifest(basins,total_years,years_per_shard,seed,output_format,max_restarts,restart_policy))
+        print('manifest written to',manifest)
+
+    if run_shards:
+        failed=run_local(manifest,processes,resume,metrics)
+        if len(failed)>0:
+            print('shards',failed,'failed, rerun with python MASTER_shards.py --resume')
+            sys.exit(1)
+        merge_shards(manifest,remove=True)
+        print('STORM finished in',round(time.time()-start_time,1),'s')
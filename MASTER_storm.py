@@ -12,13 +12,8 @@ This is the STORM model master program
 Copyright (C) 2020 Nadia Bloemendaal. All versions released under the GNU General Public License v3.0.
 """
 
-import numpy as np
-
 #Custom made modules
-from SELECT_BASIN import Basins_WMO
-from SAMPLE_STARTING_POINT import Startingpoint
-from SAMPLE_TC_MOVEMENT import TC_movement
-from SAMPLE_TC_PRESSURE import TC_pressure
+from STORM_DRIVER import run_storm
 
 import os
 import sys
@@ -26,197 +21,28 @@ dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
 __location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
 
 import time
-start_time=time.time()
 
 #==============================================================================
-# Step 1: Define basin and number of years to run
+# Step 1: Define basins and number of years to run
 #==============================================================================
-#please set basin (EP,NA,NI,SI,SP,WP)
-basin='NI'
-loop=1 #ranges between 0 and 9 to simulate slices of 1000 years
-total_years=1000 #set the total number of years you'd like to simulate
-
-for nloop in range(0,loop):
-    print ('basin:',basin, nloop)
-    TC_data=[] #This list is composed of: [year,storm number,lat,lon,pressure,wind,rmax,category,Holland B parameter,precipitation,landfall flag]
-    #==============================================================================
-    #     Step 2: load grid with weighted genesis counts
-    #==============================================================================
-    for year in range(0,total_years):
-        storms_per_year,genesis_month,lat0,lat1,lon0,lon1=Basins_WMO(basin) 
-
-        if storms_per_year>0:
-                #==============================================================================
-                # Step 3: Generate (list of) genesis locations
-                #==============================================================================
-                lon_genesis_list,lat_genesis_list=Startingpoint(storms_per_year,genesis_month,basin) 
-                #==============================================================================
-                # Step 4: Generate initial conditions    
-                #==============================================================================
-                latlist,lonlist,landfalllist=TC_movement(lon_genesis_list,lat_genesis_list,basin)
-                TC_data=TC_pressure(basin,latlist,lonlist,landfalllist,year,storms_per_year,genesis_month,TC_data)
-
-    TC_data=np.array(TC_data)
-    np.savetxt(os.path.join(__location__,'STORM_DATA_IBTRACS_'+str(basin)+'_'+str(total_years)+'_YEARS_'+str(nloop)+'.txt'),TC_data,fmt='%5s',delimiter=',')
-    
-    
-    
-    #please set basin (EP,NA,NI,SI,SP,WP)
-basin='NA'
-for nloop in range(0,loop):
-    print ('basin:',basin, nloop)
-    TC_data=[] #This list is composed of: [year,storm number,lat,lon,pressure,wind,rmax,category,Holland B parameter,precipitation,landfall flag]
-    #==============================================================================
-    #     Step 2: load grid with weighted genesis counts
-    #==============================================================================
-    for year in range(0,total_years):
-        storms_per_year,genesis_month,lat0,lat1,lon0,lon1=Basins_WMO(basin) 
-
-        if storms_per_year>0:
-                #==============================================================================
-                # Step 3: Generate (list of) genesis locations
-                #==============================================================================
-                lon_genesis_list,lat_genesis_list=Startingpoint(storms_per_year,genesis_month,basin) 
-                #==============================================================================
-                # Step 4: Generate initial conditions    
-                #==============================================================================
-                latlist,lonlist,landfalllist=TC_movement(lon_genesis_list,lat_genesis_list,basin)
-                TC_data=TC_pressure(basin,latlist,lonlist,landfalllist,year,storms_per_year,genesis_month,TC_data)
-
-    TC_data=np.array(TC_data)
-    np.savetxt(os.path.join(__location__,'STORM_DATA_IBTRACS_'+str(basin)+'_'+str(total_years)+'_YEARS_'+str(nloop)+'.txt'),TC_data,fmt='%5s',delimiter=',')
-    
-    
-    
-        #please set basin (EP,NA,NI,SI,SP,WP)
-basin='NI'
-for nloop in range(0,loop):
-    print ('basin:',basin, nloop)
-    TC_data=[] #This list is composed of: [year,storm number,lat,lon,pressure,wind,rmax,category,Holland B parameter,precipitation,landfall flag]
-    #==============================================================================
-    #     Step 2: load grid with weighted genesis counts
-    #==============================================================================
-    for year in range(0,total_years):
-        storms_per_year,genesis_month,lat0,lat1,lon0,lon1=Basins_WMO(basin) 
-
-        if storms_per_year>0:
-                #==============================================================================
-                # Step 3: Generate (list of) genesis locations
-                #==============================================================================
-                lon_genesis_list,lat_genesis_list=Startingpoint(storms_per_year,genesis_month,basin) 
-                #==============================================================================
-                # Step 4: Generate initial conditions    
-                #==============================================================================
-                latlist,lonlist,landfalllist=TC_movement(lon_genesis_list,lat_genesis_list,basin)
-                TC_data=TC_pressure(basin,latlist,lonlist,landfalllist,year,storms_per_year,genesis_month,TC_data)
-
-    TC_data=np.array(TC_data)
-    np.savetxt(os.path.join(__location__,'STORM_DATA_IBTRACS_'+str(basin)+'_'+str(total_years)+'_YEARS_'+str(nloop)+'.txt'),TC_data,fmt='%5s',delimiter=',')
-    
-    
-            #please set basin (EP,NA,NI,SI,SP,WP)
-basin='SI'
-for nloop in range(0,loop):
-    print ('basin:',basin, nloop)
-    TC_data=[] #This list is composed of: [year,storm number,lat,lon,pressure,wind,rmax,category,Holland B parameter,precipitation,landfall flag]
-    #==============================================================================
-    #     Step 2: load grid with weighted genesis counts
-    #==============================================================================
-    for year in range(0,total_years):
-        storms_per_year,genesis_month,lat0,lat1,lon0,lon1=Basins_WMO(basin) 
-
-        if storms_per_year>0:
-                #==============================================================================
-                # Step 3: Generate (list of) genesis locations
-                #==============================================================================
-                lon_genesis_list,lat_genesis_list=Startingpoint(storms_per_year,genesis_month,basin) 
-                #==============================================================================
-                # Step 4: Generate initial conditions    
-                #==============================================================================
-                latlist,lonlist,landfalllist=TC_movement(lon_genesis_list,lat_genesis_list,basin)
-                TC_data=TC_pressure(basin,latlist,lonlist,landfalllist,year,storms_per_year,genesis_month,TC_data)
+#please set the basins (EP,NA,NI,SI,SP,WP)
+basins=['EP','NA','NI','SI','SP','WP']
+loop=1 #ranges between 1 and 10 to simulate slices of 1000 years
+total_years=1000 #set the total number of years you'd like to simulate per slice
+processes=os.cpu_count() #number of worker processes
+years_per_unit=None #number of years per work unit, rounded up to whole blocks of STORM_DRIVER.BLOCK_YEARS. None splits the slices over all processes
+seed=None #seed of the random number streams. Set an integer to reproduce a run (None draws a new seed)
+output_format='txt' #'txt' (comma separated text) or 'h5' (HDF5 with typed columns, load with STORM_OUTPUT.load_tracks)
+metrics=False #write counters (restarts, time steps, landfall decays, ...) and stage timers of every slice to STORM_DATA_..._METRICS.json
+max_restarts=100 #number of times a TC with an unrealistic pressure is regenerated from genesis (None for no limit)
+restart_policy='discard' #'discard' the TC or 'clamp' its pressure to the lowest realistic pressure when max_restarts is exceeded
+resume='--resume' in sys.argv[1:] #continue an interrupted run from its checkpoints: python MASTER_storm.py --resume
 
-    TC_data=np.array(TC_data)
-    np.savetxt(os.path.join(__location__,'STORM_DATA_IBTRACS_'+str(basin)+'_'+str(total_years)+'_YEARS_'+str(nloop)+'.txt'),TC_data,fmt='%5s',delimiter=',')
-    
-    
-    
-                #please set basin (EP,NA,NI,SI,SP,WP)
-basin='NI'
-for nloop in range(0,loop):
-    print ('basin:',basin, nloop)
-    TC_data=[] #This list is composed of: [year,storm number,lat,lon,pressure,wind,rmax,category,Holland B parameter,precipitation,landfall flag]
-    #==============================================================================
-    #     Step 2: load grid with weighted genesis counts
-    #==============================================================================
-    for year in range(0,total_years):
-        storms_per_year,genesis_month,lat0,lat1,lon0,lon1=Basins_WMO(basin) 
-
-        if storms_per_year>0:
-                #==============================================================================
-                # Step 3: Generate (list of) genesis locations
-                #==============================================================================
-                lon_genesis_list,lat_genesis_list=Startingpoint(storms_per_year,genesis_month,basin) 
-                #==============================================================================
-                # Step 4: Generate initial conditions    
-                #==============================================================================
-                latlist,lonlist,landfalllist=TC_movement(lon_genesis_list,lat_genesis_list,basin)
-                TC_data=TC_pressure(basin,latlist,lonlist,landfalllist,year,storms_per_year,genesis_month,TC_data)
-
-    TC_data=np.array(TC_data)
-    np.savetxt(os.path.join(__location__,'STORM_DATA_IBTRACS_'+str(basin)+'_'+str(total_years)+'_YEARS_'+str(nloop)+'.txt'),TC_data,fmt='%5s',delimiter=',')
-    
-    
-    
-                    #please set basin (EP,NA,NI,SI,SP,WP)
-basin='SP'
-for nloop in range(0,loop):
-    print ('basin:',basin, nloop)
-    TC_data=[] #This list is composed of: [year,storm number,lat,lon,pressure,wind,rmax,category,Holland B parameter,precipitation,landfall flag]
-    #==============================================================================
-    #     Step 2: load grid with weighted genesis counts
-    #==============================================================================
-    for year in range(0,total_years):
-        storms_per_year,genesis_month,lat0,lat1,lon0,lon1=Basins_WMO(basin) 
-
-        if storms_per_year>0:
-                #==============================================================================
-                # Step 3: Generate (list of) genesis locations
-                #==============================================================================
-                lon_genesis_list,lat_genesis_list=Startingpoint(storms_per_year,genesis_month,basin) 
-                #==============================================================================
-                # Step 4: Generate initial conditions    
-                #==============================================================================
-                latlist,lonlist,landfalllist=TC_movement(lon_genesis_list,lat_genesis_list,basin)
-                TC_data=TC_pressure(basin,latlist,lonlist,landfalllist,year,storms_per_year,genesis_month,TC_data)
-
-    TC_data=np.array(TC_data)
-    np.savetxt(os.path.join(__location__,'STORM_DATA_IBTRACS_'+str(basin)+'_'+str(total_years)+'_YEARS_'+str(nloop)+'.txt'),TC_data,fmt='%5s',delimiter=',')
-    
-    
-    
-    
-                        #please set basin (EP,NA,NI,SI,SP,WP)
-basin='WP'
-for nloop in range(0,loop):
-    print ('basin:',basin, nloop)
-    TC_data=[] #This list is composed of: [year,storm number,lat,lon,pressure,wind,rmax,category,Holland B parameter,precipitation,landfall flag]
-    #==============================================================================
-    #     Step 2: load grid with weighted genesis counts
-    #==============================================================================
-    for year in range(0,total_years):
-        storms_per_year,genesis_month,lat0,lat1,lon0,lon1=Basins_WMO(basin) 
-
-        if storms_per_year>0:
-                #==============================================================================
-                # Step 3: Generate (list of) genesis locations
-                #==============================================================================
-                lon_genesis_list,lat_genesis_list=Startingpoint(storms_per_year,genesis_month,basin) 
-                #==============================================================================
-                # Step 4: Generate initial conditions    
-                #==============================================================================
-                latlist,lonlist,landfalllist=TC_movement(lon_genesis_list,lat_genesis_list,basin)
-                TC_data=TC_pressure(basin,latlist,lonlist,landfalllist,year,storms_per_year,genesis_month,TC_data)
-
-    TC_data=np.array(TC_data)
-    np.savetxt(os.path.join(__location__,'STORM_DATA_IBTRACS_'+str(basin)+'_'+str(total_years)+'_YEARS_'+str(nloop)+'.txt'),TC_data,fmt='%5s',delimiter=',')
+#==============================================================================
+# Steps 2-4 (genesis, track and pressure) are run per (basin, slice, year range)
+# work unit on the process pool, see STORM_DRIVER.py
+#==============================================================================
+if __name__=='__main__':
+    start_time=time.time()
+    run_storm(basins,loop,total_years,processes=processes,years_per_unit=years_per_unit,path=__location__,output_format=output_format,seed=seed,resume=resume,metrics=metrics,max_restarts=max_restarts,restart_policy=restart_policy)
+    print('STORM finished in',round(time.time()-start_time,1),'s')
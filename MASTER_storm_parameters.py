@@ -16,6 +16,7 @@ import holland_model as hm
 import math
 from scipy import spatial
 import storm_parameters as sp
+from STORM_OUTPUT import load_track_table
 
 def Basins_WMO(basin):
     if basin=='EP': #Eastern Pacific
@@ -90,7 +91,7 @@ tree=spatial.cKDTree(points)
 # Open the STORM dataset
 #==============================================================================
 #Please make sure to point to the right directory!
-data=np.loadtxt('STORM_DATA_IBTRACS_'+str(basin)+'_1000_YEARS_'+str(index)+'.txt',delimiter=',')
+data=load_track_table('STORM_DATA_IBTRACS_'+str(basin)+'_1000_YEARS_'+str(index)+'.txt') #use the .h5 file if the tracks were stored in HDF5
 yearall,data1,data2,timeall,data4,latall,lonall,presall,windall,rmaxall,data10,landall,distlandall=data[:,0],data[:,1],data[:,2],data[:,3],data[:,4],data[:,5],data[:,6],data[:,7],data[:,8],data[:,9],data[:,10],data[:,11],data[:,12]
 
 # Create arrays for the transitional speed, residence-time, and relative angle and complexity track
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+This module is part of the IH-STORM model
+
+For more information, please see
+Bloemendaal, N., Haigh, I.D., de Moel, H. et al.
+Generation of a global synthetic tropical cyclone hazard dataset using STORM.
+Sci Data 7, 40 (2020). https://doi.org/10.1038/s41597-020-0381-2
+
+This is the STORM module with the pool of random numbers. RandomPool draws standard normal and
+uniform numbers from a numpy Generator in large blocks and hands them out by cursor, scaled per call.
+It has the normal, uniform and choice methods of numpy.random.Generator, so it can be passed as rng
+to the simulation functions. The numbers only depend on the Generator and the order of the calls,
+so a seeded stream gives the same results on every run.
+
+Released under the GNU General Public License v3.0
+"""
+import numpy as np
+import os
+import sys
+dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
+__location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
+
+BLOCK_SIZE=8192 #number of standard normal and uniform numbers drawn at once
+
+class RandomPool:
+    """
+    Block-buffered random numbers
+
+    Parameters
+    ----------
+    rng : numpy.random.Generator, the source of the random numbers.
+    block_size : number of random numbers drawn at once. The default is BLOCK_SIZE.
+
+    """
+    def __init__(self,rng,block_size=BLOCK_SIZE):
+        self.rng=rng
+        self.block_size=block_size
+        self.normals=np.zeros(0)
+        self.uniforms=np.zeros(0)
+        self.normal_cursor=0
+        self.uniform_cursor=0
+
+    def __getattr__(self,name):
+        #all other Generator methods (poisson, integers, ...) are taken from the Generator
+        return getattr(self.rng,name)
+
+    def take_normals(self,n):
+        """
+        Take n standard normal numbers from the pool
+        """
+        if self.normal_cursor+n>len(self.normals):
+            if n>self.block_size:
+                return self.rng.standard_normal(n)
+            self.normals=self.rng.standard_normal(self.block_size)
+            self.normal_cursor=0
+        z=self.normals[self.normal_cursor:self.normal_cursor+n]
+        self.normal_cursor+=n
+        return z
+
+    def take_uniforms(self,n):
+        """
+        Take n uniform numbers in [0,1) from the pool
+        """
+        if self.uniform_cursor+n>len(self.uniforms):
+            if n>self.block_size:
+                return self.rng.random(n)
+            self.uniforms=self.rng.random(self.block_size)
+            self.uniform_cursor=0
+        u=self.uniforms[self.uniform_cursor:self.uniform_cursor+n]
+        self.uniform_cursor+=n
+        return u
+
+    def normal(self,loc=0.,scale=1.,size=None):
+        """
+        Normal distribution, see numpy.random.Generator.normal
+        """
+        if size is None:
+            if np.ndim(loc)==0 and np.ndim(scale)==0:
+                return loc+scale*float(self.take_normals(1)[0])
+            size=np.broadcast(loc,scale).shape
+        z=self.take_normals(int(np.prod(size))).reshape(size)
+        return loc+scale*z
+
+    def uniform(self,low=0.,high=1.,size=None):
+        """
+        Uniform distribution in [low,high), see numpy.random.Generator.uniform
+        """
+        if size is None:
+            if np.ndim(low)==0 and np.ndim(high)==0:
+                return low+(high-low)*float(self.take_uniforms(1)[0])
+            size=np.broadcast(low,high).shape
+        u=self.take_uniforms(int(np.prod(size))).reshape(size)
+        return low+(high-low)*u
+
+    def choice(self,a,size=None):
+        """
+        Uniform random sample (with replacement) from the elements of a, see numpy.random.Generator.choice
+        """
+        a=np.asarray(a)
+        if size is None:
+            return a[int(self.take_uniforms(1)[0]*len(a))]
+        u=self.take_uniforms(int(np.prod(size))).reshape(size)
+        return a[(u*len(a)).astype(int)]
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+This module is part of the IH-STORM model
+
+For more information, please see
+Bloemendaal, N., Haigh, I.D., de Moel, H. et al.
+Generation of a global synthetic tropical cyclone hazard dataset using STORM.
+Sci Data 7, 40 (2020). https://doi.org/10.1038/s41597-020-0381-2
+
+This is the STORM module for the random component of the pressure change. The pressure change
+dp0=y+epsilon of the James-Mason formula is kept between dpmin and dpmax by drawing epsilon from
+the truncated normal distribution (inverse CDF), so every draw takes a fixed number of operations.
+If y is already far outside [dpmin,dpmax] a uniform pressure change is taken instead (fallback).
+
+Released under the GNU General Public License v3.0
+"""
+import numpy as np
+from scipy.special import ndtr,ndtri
+import os
+import sys
+dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
+__location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
+
+#Custom made modules
+import STORM_METRICS
+
+def truncated_normal(mu,std,lower,upper,rng):
+    """
+    Sample from the normal distribution N(mu,std) truncated to [lower,upper] with the inverse CDF (arrays)
+
+    Parameters
+    ----------
+    mu,std : arrays of mean and standard deviation.
+    lower,upper : arrays of lower and upper bound (-inf/inf for no bound).
+    rng : numpy.random.Generator.
+
+    Returns
+    -------
+    x : array of samples. nan where the probability of [lower,upper] is too small to sample from.
+
+    """
+    with np.errstate(divide='ignore',invalid='ignore'):
+        a=(lower-mu)/std
+        b=(upper-mu)/std
+        #sample in the lower tail, where the CDF is most accurate
+        flip=a>0
+        a,b=np.where(flip,-b,a),np.where(flip,-a,b)
+        Fa,Fb=ndtr(a),ndtr(b)
+        z=ndtri(Fa+rng.uniform(0,1,np.shape(mu))*(Fb-Fa))
+        z=np.where(Fb>Fa,np.clip(z,a,b),np.nan)
+        return mu+std*np.where(flip,-z,z)
+
+def sample_pressure_change(y,EPmu,EPstd,dpmin,dpmax,rng):
+    """
+    Add the random component epsilon~N(EPmu,EPstd) to the James-Mason pressure change y, and keep it between dpmin and dpmax.
+    If y+epsilon is out of range, epsilon is drawn from the truncated normal distribution. If y is already far outside
+    the range (y-dpmin<=EPmu-2*EPstd or y-dpmax>=EPmu+2*EPstd), the pressure change is sampled uniformly from
+    [dpmin,0] or [0,dpmax].
+
+    Parameters
+    ----------
+    y : pressure change(s) from the James-Mason formula.
+    EPmu,EPstd : mean and standard deviation of the random component.
+    dpmin,dpmax : minimum and maximum pressure change in the underlying dataset.
+    rng : numpy.random.Generator.
+
+    Returns
+    -------
+    dp0 : pressure change(s), a float if y is a float.
+
+    """
+    scalar=np.ndim(y)==0
+    if scalar: #most draws are in range
+        dp0=y+rng.normal(EPmu,EPstd)
+        if dpmin<=dp0<=dpmax:
+            STORM_METRICS.count('pressure_change_draws')
+            return float(dp0)
+    
+    y,EPmu,EPstd,dpmin,dpmax=np.broadcast_arrays(*[np.atleast_1d(np.asarray(x,dtype=float)) for x in (y,EPmu,EPstd,dpmin,dpmax)])
+
+    if not scalar:
+        dp0=y+rng.normal(EPmu,EPstd)
+    else:
+        dp0=np.atleast_1d(np.asarray(dp0,dtype=float))
+    low=dp0<dpmin #more intensification than seen in the underlying dataset
+    high=dp0>dpmax #more weakening than seen in the underlying dataset
+
+    resample_low=y-dpmin>EPmu-2.*EPstd
+    resample_high=y-dpmax<EPmu+2.*EPstd
+    truncated=(low & resample_low) | (high & resample_high)
+    if np.any(truncated):
+        lower=np.where(resample_low,dpmin-y,-np.inf)[truncated]
+        upper=np.where(resample_high,dpmax-y,np.inf)[truncated]
+        dp0[truncated]=y[truncated]+truncated_normal(EPmu[truncated],EPstd[truncated],lower,upper,rng)
+
+    #fallback: y is already far outside [dpmin,dpmax], or the truncated normal distribution has no probability mass left
+    low=(dp0<dpmin) | (np.isnan(dp0) & (y+EPmu<dpmin))
+    high=(dp0>dpmax) | (np.isnan(dp0) & ~low)
+    dp0[low]=rng.uniform(dpmin[low],0)
+    dp0[high]=rng.uniform(0,dpmax[high])
+
+    #number of pressure changes drawn, of draws that were out of range and drawn again from the truncated normal
+    #distribution, and of pressure changes taken from the uniform fallback
+    STORM_METRICS.count('pressure_change_draws',len(dp0))
+    STORM_METRICS.count('pressure_change_truncated',np.sum(truncated))
+    STORM_METRICS.count('pressure_change_fallback',np.sum(low)+np.sum(high))
+
+    if scalar:
+        return float(dp0[0])
+    return dp0
@@ -18,22 +18,27 @@ import sys
 dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
 __location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
 
-def sample_rmax(p,rmax_pres):
+def sample_rmax(p,rmax_pres,rng):
     if p>940.:
-        r=np.random.choice(rmax_pres[2],1)
+        r=rng.choice(rmax_pres[2],1)
     elif p<=940. and p>920.:
-        r=np.random.choice(rmax_pres[1],1)
+        r=rng.choice(rmax_pres[1],1)
     else:
-        r=np.random.choice(rmax_pres[0],1)
+        r=rng.choice(rmax_pres[0],1)
     return float(r)
 
 
-def Add_Rmax(pressure):    
-    rmax_pres=np.load(os.path.join(__location__,'RMAX_PRESSURE.npy'),allow_pickle=True).item()
+def Add_Rmax(pressure,context=None,rng=None):    
+    if rng is None:
+        rng=np.random.default_rng()
+    if context is not None:
+        rmax_pres=context.rmax_pressure
+    else:
+        rmax_pres=np.load(os.path.join(__location__,'RMAX_PRESSURE.npy'),allow_pickle=True).item()
         
     #sample rmax at genesis
     rmaxlist=[]
-    rgenesis=sample_rmax(pressure[0],rmax_pres)
+    rgenesis=sample_rmax(pressure[0],rmax_pres,rng)
     rmaxlist.append(rgenesis)   
      
     #sample rmax at minimum pressure    
@@ -41,7 +46,7 @@ def Add_Rmax(pressure):
     ind=pressure.index(p_min)
     ind=int(ind)
     
-    rmin=sample_rmax(p_min,rmax_pres)
+    rmin=sample_rmax(p_min,rmax_pres,rng)
         
     if rmin<rgenesis and ind>0: #if the new radius is smaller than the old one, AND the min pressure is not at genesis
         for i in range(1,ind+1):
@@ -53,7 +58,7 @@ def Add_Rmax(pressure):
      
     rind=rmaxlist[-1]
     #sample radius at dissipation
-    rdis=sample_rmax(pressure[-1],rmax_pres)
+    rdis=sample_rmax(pressure[-1],rmax_pres,rng)
     if rdis>rind: #if radius is larger than the last added radius to the rmax_list:
         for i in range(ind+1,len(pressure)):
             radius=(rdis-rind)/(len(pressure)-1-ind)*i+rdis-(len(pressure)-1)*(rdis-rind)/(len(pressure)-1-ind)
@@ -63,3 +68,93 @@ def Add_Rmax(pressure):
             rmaxlist.append(rind)
     
     return rmaxlist
+
+def rmax_classes(rmax_pres):
+    """
+    The radii of the three pressure classes of RMAX_PRESSURE.npy in one array
+
+    Parameters
+    ----------
+    rmax_pres : dictionary with the radii per pressure class (0: p<=920 hPa, 1: 920<p<=940 hPa, 2: p>940 hPa).
+
+    Returns
+    -------
+    values : radii, class by class.
+    start : index of the first radius of every class in values.
+    count : number of radii of every class.
+
+    """
+    radii=[np.asarray(rmax_pres[c],dtype=float) for c in range(0,3)]
+    count=np.array([len(r) for r in radii])
+    start=np.concatenate(([0],np.cumsum(count)[:-1]))
+    return np.concatenate(radii),start,count
+
+def sample_rmax_array(p,u,values,start,count):
+    """
+    sample_rmax for arrays of pressures, with the uniform numbers u in [0,1) (one per pressure)
+    """
+    c=np.where(p>940.,2,np.where(p>920.,1,0))
+    return values[start[c]+np.minimum((u*count[c]).astype(int),count[c]-1)]
+
+def Add_Rmax_batch(pressure,offsets,context=None,rng=None):
+    """
+    Batched version of Add_Rmax. The radii at genesis, minimum pressure and dissipation of all TCs
+    are drawn at once, and the radii in between are interpolated for all time steps at once.
+
+    Parameters
+    ----------
+    pressure : flat array of the pressures (hPa) of all TCs.
+    offsets : TC number k is stored in [offsets[k]:offsets[k+1]], every TC has at least 1 time step.
+    context : SimulationContext of the basin. The default is RMAX_PRESSURE.npy in the model directory.
+    rng : numpy.random.Generator. The default is a new, unseeded generator.
+
+    Returns
+    -------
+    rmax : flat array of the radius to maximum winds (km), in the order of pressure.
+
+    """
+    if rng is None:
+        rng=np.random.default_rng()
+    if context is not None:
+        rmax_pres=context.rmax_pressure
+    else:
+        rmax_pres=np.load(os.path.join(__location__,'RMAX_PRESSURE.npy'),allow_pickle=True).item()
+    values,start,count=rmax_classes(rmax_pres)
+
+    pressure=np.asarray(pressure,dtype=float)
+    offsets=np.asarray(offsets)
+    first,last=offsets[:-1],offsets[1:]-1
+    lengths=last-first+1
+    n=len(lengths)
+    if n==0:
+        return np.zeros(0)
+
+    #index of the (first) minimum pressure of every TC, counted from genesis
+    p_min=np.minimum.reduceat(pressure,first)
+    candidates=np.flatnonzero(pressure==np.repeat(p_min,lengths))
+    ind=candidates[np.searchsorted(candidates,first)]-first
+
+    #sample rmax at genesis, at minimum pressure and at dissipation, in this order per TC
+    u=rng.uniform(0.,1.,(n,3))
+    rgenesis=sample_rmax_array(pressure[first],u[:,0],values,start,count)
+    rmin=sample_rmax_array(p_min,u[:,1],values,start,count)
+    rdis=sample_rmax_array(pressure[last],u[:,2],values,start,count)
+
+    #TC number and time step of every entry
+    storm=np.repeat(np.arange(n),lengths)
+    i=np.arange(len(pressure))-first[storm]
+
+    #genesis to minimum pressure: the radius decreases linearly if rmin is smaller (and the minimum is not at genesis)
+    shrink=(rmin<rgenesis) & (ind>0)
+    nind=np.where(ind>0,ind,1)
+    rind=np.where(shrink,ind*(rmin-rgenesis)/nind+rgenesis,rgenesis)
+    rmax=np.where(shrink[storm],i*(rmin-rgenesis)[storm]/nind[storm]+rgenesis[storm],rgenesis[storm])
+
+    #minimum pressure to dissipation: the radius increases linearly if rdis is larger
+    grow=rdis>rind
+    ndis=np.where(lengths-1-ind>0,lengths-1-ind,1)
+    after=i>ind[storm]
+    s,ia=storm[after],i[after]
+    rmax[after]=np.where(grow[s],(rdis-rind)[s]/ndis[s]*ia+rdis[s]-(lengths-1)[s]*(rdis-rind)[s]/ndis[s],rind[s])
+
+    return rmax
@@ -13,108 +13,77 @@ Copyright (C) 2020 Nadia Bloemendaal. All versions released under the GNU Genera
 """
 #==============================================================================
 # Variables used in this code:
-    #grid_copy: copy of grid, the 1x1 deg matrix with genesis counts
     #no_storms: number of storms per year
     #lon_genesis_list,lat_genesis_list: lists of lon and lat points of genesis
-    #value: value in copy_grid
-    #weighted_list_index: list of indices (weighted) corresponding to the value in grid_copy. Example: if the value is 5, the correspondng index is listed 5 times.
-    #idx: randomly chosen index of weighted_list_index
+    #cumulative_weights: cumulative sum of the genesis weights per grid-index. The weight of a cell with value v in the genesis matrix is int(10*v)
+    #todo: storms of the month that still need a genesis location
+    #idx0: randomly chosen grid-indices, sampled from cumulative_weights
     #row,col: row and column of grid_copy corresponding to the chosen index
     #lat_pert,lon_pert: random value between 0 and 1, indicating the genesis location. This is NOT the actual longitude latitude, but indexed based on the coordinates of 'grid'
 #==============================================================================
 
 import numpy as np
-import random
 import os
 import sys
 dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
 __location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
 
-from SELECT_BASIN import Basins_WMO
-def Check_EP_formation(lat,lon): 
-    """
-    Check if formation is in Eastern Pacific (this should be inhibited if basin==NA)
-    Parameters
-    ----------
-    lat : latitude coordinate of genesis.
-    lon : longitude coordinate of genesis
+from SIMULATION_CONTEXT import get_context
 
-    Returns
-    -------
-    l : 1=yes (formation in EP),0=no (no formation in EP).
-
-    """    
-    if lat<=60. and lon<260.:
-        l=1
-    elif lat<=17.5 and lon<270.:
-        l=1
-    elif lat<=15. and lon<275.:
-        l=1
-    elif lat<=10. and lon<276.:
-        l=1
-    elif lat<=9. and lon<290.:
-        l=1
-    else:
-        l=0
-    return l
-    
-    
-def Check_NA_formation(lat,lon): 
+def Check_EP_formation_array(lat,lon):
     """
-    Check if formation is in North Atlantic (this should be inhibited if basin==EP)
+    Check if formation is in Eastern Pacific (this should be inhibited if basin==NA), for arrays of genesis locations
+
     Parameters
     ----------
-    lat : latitude coordinate of genesis
-    lon : longitude coordinate of genesis
+    lat : array of latitude coordinates of genesis.
+    lon : array of longitude coordinates of genesis
 
     Returns
     -------
-    l : 1=yes (formation in NA) 0=no (no formation in NA).
+    l : array, 1=yes (formation in EP),0=no (no formation in EP).
 
     """
-    if lat<=60. and lat>17.5 and lon>260.:
-        l=1
-    elif lat<=17.5 and lat>15. and lon>270.:
-        l=1
-    elif lat<=15. and lat>10 and lon>275.:
-        l=1
-    elif lat<=10. and lon>276.:
-        l=1
-    else:
-        l=0
-    return l
-
-def Check_if_landfall(lat,lon,basin,land_mask):
+    l=(lat<=60.) & (lon<260.)
+    l|=(lat<=17.5) & (lon<270.)
+    l|=(lat<=15.) & (lon<275.)
+    l|=(lat<=10.) & (lon<276.)
+    l|=(lat<=9.) & (lon<290.)
+    return l.astype(int)
+
+def Check_NA_formation_array(lat,lon):
     """
+    Check if formation is in North Atlantic (this should be inhibited if basin==EP), for arrays of genesis locations
+
     Parameters
     ----------
-    lat : latitude position of TC
-    lon : longitude position of TC
-    lat1 : upper left corner latitude coordinate of basin
-    lon0 : upper left corner longitude coordinate of basin
-    land_mask : land-sea mask
+    lat : array of latitude coordinates of genesis
+    lon : array of longitude coordinates of genesis
 
     Returns
     -------
-    l : 0=no landfall, 1=landfall
+    l : array, 1=yes (formation in NA) 0=no (no formation in NA).
 
     """
-    s,monthdummy,lat0_WMO,lat1_WMO,lon0_WMO,lon1_WMO=Basins_WMO(basin)
-    
-    x=int(10*(lon-lon0_WMO))
-    y=int(10*(lat1_WMO-lat))
-    l=land_mask[y,x]   
-    return l
+    l=(lat<=60.) & (lat>17.5) & (lon>260.)
+    l|=(lat<=17.5) & (lat>15.) & (lon>270.)
+    l|=(lat<=15.) & (lat>10) & (lon>275.)
+    l|=(lat<=10.) & (lon>276.)
+    return l.astype(int)
 
-def Startingpoint(no_storms,monthlist,basin):
+def Startingpoint(no_storms,monthlist,basin,context=None,rng=None):
     """
-    This function samples the genesis locations of every TC in a given year
+    This function samples the genesis locations of every TC in a given year.
+    The genesis cells are drawn from the cumulative genesis weights of the month (see SimulationContext.genesis_weights),
+    all TCs of the same month are sampled at once.
 
     Parameters
     ----------
     no_storms : number of TCs in given year
     monthlist : months in which TCs were formed.
     basin : basin.
+    context : SimulationContext of the basin. The default is the (cached) context of the basin.
+    rng : numpy.random.Generator. The default is a new, unseeded generator.
 
     Returns
     -------
@@ -122,70 +91,50 @@ def Startingpoint(no_storms,monthlist,basin):
     lat_coordinates : list of latitude coordinates of genesis locations
 
     """
-    basins=['EP','NA','NI','SI','SP','WP']
-    basin_name = dict(zip(basins,[0,1,2,3,4,5]))
-    idx=basin_name[basin]
-    
-    lon_coordinates=[]
-    lat_coordinates=[]
-    weighted_list_index=[]
-    weighted_list=[]
-    
+    if context is None:
+        context=get_context(basin)
+    if rng is None:
+        rng=np.random.default_rng()
         
-    s,monthdummy,lat0,lat1,lon0,lon1=Basins_WMO(basin)
+    lat1,lon0,lon1=context.lat1,context.lon0,context.lon1
   
-    land_mask=np.loadtxt(os.path.join(dir_path,'Land_ocean_mask_'+str(basin)+'.txt'))
-
-    for month in monthlist:
-        print(idx,month)
-        
-        grid_copy=np.loadtxt(os.path.join(dir_path,'GRID_GENESIS_MATRIX_'+str(idx)+'_'+str(month)+'.txt'))
-        grid_copy=np.array(grid_copy)
-        grid_copy=np.round(grid_copy,1)   
-        #==============================================================================
-        # Make a list with weighted averages. The corresponding grid-index is calculated as len(col)*row_index+col_index
-        #============================================================================== 
+    land_mask=context.land_mask
     
-        for i in range(0,len(grid_copy[:,0])):
-            for j in range(0,len(grid_copy[0,:])):
-                if grid_copy[i,j]>-1:
-                    value=int(10*grid_copy[i,j])
-                else:
-                    value=0
-                if value>0.:
-                    for k in range(0,value):
-                        weighted_list.append(value)
-                        weighted_list_index.append(i*(len(grid_copy[0,:])-1)+j)    
-                                
-        #==============================================================================
-        # The starting longitude and latitude coordinates 
-        #==============================================================================
-        var=0
-        while var==0:
-            idx0=random.choice(weighted_list_index)
-
-            row=int(np.floor(idx0/(len(grid_copy[0,:])-1)))
-            col=int(idx0%(len(grid_copy[0,:])-1))
-            lat_pert=random.uniform(0,0.94) #take 0.94 to make sure the randomly selected point is still inside the grid box after rounding off. 
-            lon_pert=random.uniform(0,0.94)
-            lon=lon0+round(col+lon_pert,1)
-            lat=lat1-round(row+lat_pert,1)
+    monthlist=np.asarray(monthlist[:no_storms])
+    lon_coordinates=np.zeros(len(monthlist))
+    lat_coordinates=np.zeros(len(monthlist))
+
+    for month in np.unique(monthlist):
+        ncol=len(context.genesis_grid(month)[0,:])
+        cumulative_weights=context.genesis_weights(month)
+        if cumulative_weights[-1]<=0:
+            raise ValueError('Genesis matrix of basin '+str(basin)+' and month '+str(month)+' has no genesis counts')
+        
+        todo=np.flatnonzero(monthlist==month)
+        while len(todo)>0:
+            #==============================================================================
+            # Draw the grid-indices. The grid-index is calculated as (len(col)-1)*row_index+col_index
+            #==============================================================================             
+            u=rng.uniform(0,cumulative_weights[-1],len(todo))
+            idx0=np.searchsorted(cumulative_weights,u,side='right')
             
+            row=idx0//(ncol-1)
+            col=idx0%(ncol-1)
+            lat_pert=rng.uniform(0,0.94,len(todo)) #take 0.94 to make sure the randomly selected point is still inside the grid box after rounding off. 
+            lon_pert=rng.uniform(0,0.94,len(todo))
+            lon=lon0+np.round(col+lon_pert,1)
+            lat=lat1-np.round(row+lat_pert,1)
             
-            if lon<lon1 and lat<lat1:
-                check=Check_if_landfall(lat,lon,basin,land_mask) #make sure the coordinate isn't on land
-                
-                if basin=='EP':
-                    check=Check_NA_formation(lat,lon)
-                if basin=='NA':
-                    check=Check_EP_formation(lat,lon)
-                    
-                if check==0:            
-                    lon_coordinates.append(lon)
-                    lat_coordinates.append(lat)
-                    var=1  
-                else:
-                    var=0
-    
-        if len(lon_coordinates)==no_storms:       
-            return lon_coordinates,lat_coordinates
+            valid=(lon<lon1) & (lat<lat1)
+            if basin=='EP':
+                valid[valid]=Check_NA_formation_array(lat[valid],lon[valid])==0
+            elif basin=='NA':
+                valid[valid]=Check_EP_formation_array(lat[valid],lon[valid])==0
+            else:
+                valid[valid]=land_mask.landfall(lat[valid],lon[valid])==0 #make sure the coordinate isn't on land
+            
+            lon_coordinates[todo[valid]]=lon[valid]
+            lat_coordinates[todo[valid]]=lat[valid]
+            todo=todo[~valid]
+            
+    return lon_coordinates.tolist(),lat_coordinates.tolist()
@@ -12,7 +12,9 @@ This is the STORM module for simulation of the TC track
 Copyright (C) 2020 Nadia Bloemendaal. All versions released under the GNU General Public License v3.0
 """
 import numpy as np
-from SELECT_BASIN import Basins_WMO
+from SELECT_BASIN import Basin_boundaries
+from SIMULATION_CONTEXT import get_context
+from TRACKS import Tracks
 import os
 import sys
 dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
@@ -32,7 +34,7 @@ def find_lat_index_bins(basin,lat):
     latindex : index of bin.
 
     """
-    s,monthdummy,lat0,lat1,lon0,lon1=Basins_WMO(basin)
+    lat0,lat1,lon0,lon1=Basin_boundaries(basin)
     base=5
     latindex=np.floor(float(lat-lat0)/base)
     return latindex
@@ -76,7 +78,7 @@ def Check_if_landfall(lat,lon,lat1,lon0,land_mask):
     lon : longitude position of TC
     lat1 : upper left corner latitude coordinate of basin
     lon0 : upper left corner longitude coordinate of basin
-    land_mask : land-sea mask
+    land_mask : land-sea mask (array or LAND_MASK.LandMask)
 
     Returns
     -------
@@ -89,13 +91,15 @@ def Check_if_landfall(lat,lon,lat1,lon0,land_mask):
 
     return l
   
-def TC_movement(lon_genesis_list,lat_genesis_list,basin): 
+def TC_movement(lon_genesis_list,lat_genesis_list,basin,context=None,rng=None): 
     """
     Parameters
     ----------
     lon_genesis_list : list of longitudinal positions of genesis in a year
     lat_genesis_list : list of latitudinal positions of genesis in a year
     basin : basin
+    context : SimulationContext of the basin. The default is the (cached) context of the basin.
+    rng : numpy.random.Generator. The default is a new, unseeded generator.
     
     Returns
     ---------
@@ -104,17 +108,16 @@ def TC_movement(lon_genesis_list,lat_genesis_list,basin):
     landfallall : landfall (0=no 1=yes) along the track for every TC in a year
     """
 
-    basins=['EP','NA','NI','SI','SP','WP']
-    basin_name = dict(zip(basins,[0,1,2,3,4,5]))
-    idx=basin_name[basin]
+    if context is None:
+        context=get_context(basin)
+    if rng is None:
+        rng=np.random.default_rng()
     
-    constants_all=np.load(os.path.join(__location__,'TRACK_COEFFICIENTS.npy'),allow_pickle=True,encoding='latin1').item()
+    land_mask=context.land_mask
     
-    land_mask=np.loadtxt(os.path.join(__location__,'Land_ocean_mask_'+str(basin)+'.txt'))
+    constants=context.track_coefficients
     
-    constants=constants_all[idx]
-    
-    s,monthdummy,lat0,lat1,lon0,lon1=Basins_WMO(basin)
+    lat0,lat1,lon0,lon1=context.lat0,context.lat1,context.lon0,context.lon1
     latall=[]
     lonall=[]
     landfallall=[]
@@ -138,25 +141,25 @@ def TC_movement(lon_genesis_list,lat_genesis_list,basin):
             [a0,a1,b0,b1,b2,Elatmu,Elatstd,Elonmu,Elonstd,Dlat0mu,Dlat0std,Dlon0mu,Dlon0std]=constants[ind]    
             
             if len(latlijst)==1: #if this is the first time step after genesis, we need to sample the first change in lon/lat/pressure
-                dlat0=np.random.normal(Dlat0mu,Dlat0std,1)
-                dlon0=np.random.normal(Dlon0mu,Dlon0std,1)              
+                dlat0=rng.normal(Dlat0mu,Dlat0std,1)
+                dlon0=rng.normal(Dlon0mu,Dlon0std,1)              
             
             dlat1=LAT_JAMES_MASON(dlat0,lat,b0,b1,b2)
             if basin=='SP' or basin=='SI':
                 if lat>-10.:                    
-                    dlat1=float(dlat1-np.abs(np.random.normal(Elatmu,Elatstd)))
+                    dlat1=float(dlat1-np.abs(rng.normal(Elatmu,Elatstd)))
                 else:
-                    dlat1=float(dlat1+np.random.normal(Elatmu,Elatstd))
+                    dlat1=float(dlat1+rng.normal(Elatmu,Elatstd))
                     
             else:
                 if lat<10.:
-                    dlat1=float(dlat1+np.abs(np.random.normal(Elatmu,Elatstd)))
+                    dlat1=float(dlat1+np.abs(rng.normal(Elatmu,Elatstd)))
                 else:
-                    dlat1=float(dlat1+np.random.normal(Elatmu,Elatstd))
+                    dlat1=float(dlat1+rng.normal(Elatmu,Elatstd))
                     
 
             dlon1=LON_JAMES_MASON(dlon0,a0,a1)
-            epsilon=np.random.normal(Elonmu,Elonstd)
+            epsilon=rng.normal(Elonmu,Elonstd)
             dlon1=float(dlon1+epsilon)
             if np.abs(lat)>=45:
               if dlon1<0.:
@@ -186,3 +189,99 @@ def TC_movement(lon_genesis_list,lat_genesis_list,basin):
 
     return(latall,lonall,landfallall)           
 
+
+def TC_movement_batch(lon_genesis_list,lat_genesis_list,basin,ragged=False,context=None,rng=None):
+    """
+    Batched version of TC_movement. All TCs (e.g. of one year, or of a block of years) are
+    moved forward in lockstep as numpy arrays. TCs that move out of the basin are removed
+    from the active arrays, so every time step only the TCs that are still active are computed.
+
+    Parameters
+    ----------
+    lon_genesis_list : list of longitudinal positions of genesis
+    lat_genesis_list : list of latitudinal positions of genesis
+    basin : basin
+    ragged : if True, return the tracks as a TRACKS.Tracks (flat columns + offsets) instead of lists per TC
+    context : SimulationContext of the basin. The default is the (cached) context of the basin.
+    rng : numpy.random.Generator. The default is a new, unseeded generator.
+
+    Returns
+    ---------
+    latall : all latitude positions of the eye of TC for every TC
+    lonall : all longitude positions of the eye of TC for every TC
+    landfallall : landfall (0=no 1=yes) along the track for every TC
+    tracks : (only if ragged=True, instead of the lists) TRACKS.Tracks with the tracks of all TCs
+    """
+
+    if context is None:
+        context=get_context(basin)
+    if rng is None:
+        rng=np.random.default_rng()
+
+    land_mask=context.land_mask
+
+    constants=context.track_coefficients
+
+    lat0,lat1,lon0,lon1=context.lat0,context.lat1,context.lon0,context.lon1
+
+    lat=np.array(lat_genesis_list,dtype=float)
+    lon=np.array(lon_genesis_list,dtype=float)
+    storm=np.arange(len(lat))
+    landfall=land_mask.landfall(lat,lon) #1=landfall 0=no landfall
+
+    #every time step is stored as (TC number, lat, lon, landfall) of the TCs that are still active
+    stormsteps,latsteps,lonsteps,landfallsteps=[storm],[lat],[lon],[landfall]
+
+    #first time step after genesis: sample the first change in lon/lat
+    c=constants[np.floor((lat-lat0)/5.).astype(int)]
+    dlat0=rng.normal(c[:,9],c[:,10])
+    dlon0=rng.normal(c[:,11],c[:,12])
+
+    while len(storm)>0:
+        #constants values for latitude/longitude: [a0,a1,b0,b1,b2,Elatmu,Elatstd,Elonmu,Elonstd,Dlat0mu,Dlat0std,Dlon0mu,Dlon0std]
+        c=constants[np.floor((lat-lat0)/5.).astype(int)]
+
+        dlat1=LAT_JAMES_MASON(dlat0,lat,c[:,2],c[:,3],c[:,4])
+        epsilon=rng.normal(c[:,5],c[:,6])
+        if basin=='SP' or basin=='SI':
+            dlat1=np.where(lat>-10.,dlat1-np.abs(epsilon),dlat1+epsilon)
+        else:
+            dlat1=np.where(lat<10.,dlat1+np.abs(epsilon),dlat1+epsilon)
+
+        dlon1=LON_JAMES_MASON(dlon0,c[:,0],c[:,1])
+        epsilon=rng.normal(c[:,7],c[:,8])
+        dlon1=dlon1+epsilon
+        dlon1[(np.abs(lat)>=45)&(dlon1<0.)]=0
+
+        lat=np.round(dlat1+lat,1)
+        lon=np.round(dlon1+lon,1)
+
+        dlat0=dlat1
+        dlon0=dlon1
+
+        #keep the storms that are still inside the domain. The 0.1's are added to make sure we don't end up at the upper/rightmost edge
+        inside=(lat<=lat1-0.1)&(lat>lat0)&(lon<=lon1-0.1)&(lon>lon0)
+        storm,lat,lon,dlat0,dlon0=storm[inside],lat[inside],lon[inside],dlat0[inside],dlon0[inside]
+
+        if len(storm)>0:
+            stormsteps.append(storm)
+            latsteps.append(lat)
+            lonsteps.append(lon)
+            landfallsteps.append(land_mask.landfall(lat,lon))
+
+    #sort the time steps per TC. A stable sort keeps the time steps of every TC in chronological order
+    stormsteps=np.concatenate(stormsteps)
+    order=np.argsort(stormsteps,kind='stable')
+    latflat=np.concatenate(latsteps)[order]
+    lonflat=np.concatenate(lonsteps)[order]
+    landfallflat=np.concatenate(landfallsteps)[order]
+    offsets=np.concatenate(([0],np.cumsum(np.bincount(stormsteps,minlength=len(lat_genesis_list)))))
+
+    if ragged:
+        return Tracks(latflat,lonflat,landfallflat,offsets)
+
+    latall=[latflat[offsets[k]:offsets[k+1]].tolist() for k in range(len(offsets)-1)]
+    lonall=[lonflat[offsets[k]:offsets[k+1]].tolist() for k in range(len(offsets)-1)]
+    landfallall=[landfallflat[offsets[k]:offsets[k+1]].tolist() for k in range(len(offsets)-1)]
+
+    return(latall,lonall,landfallall)
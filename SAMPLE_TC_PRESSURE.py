@@ -13,15 +13,24 @@ Copyright (C) 2020 Nadia Bloemendaal. All versions released under GNU General Pu
 """
 
 import numpy as np
-from SELECT_BASIN import Basins_WMO
-from math import radians, cos, sin, asin, sqrt
-from SAMPLE_RMAX import Add_Rmax
+from SIMULATION_CONTEXT import get_context
+from SAMPLE_RMAX import Add_Rmax,Add_Rmax_batch
+from SAMPLE_PRESSURE_CHANGE import sample_pressure_change
+from COAST_DISTANCE import distance_from_coast_track
+import STORM_METRICS
+from TRACKS import Tracks,tracks_from_lists
 import math
 import sys
 import os
 dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
 __location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
-import random
+
+#A TC with an unrealistic pressure (p<p_threshold or nan) is regenerated from genesis. After MAX_RESTARTS restarts the
+#TC is either discarded ('discard') or its pressure is clamped to p_threshold, so it is not restarted again ('clamp')
+MAX_RESTARTS=100
+RESTART_POLICIES=['discard','clamp']
+
+SAFFIR_SIMPSON=[15.8,29.,37.6,43.4,51.1,61.6] #lowest wind speed (m/s) of category 0 (Tropical Storm) to 5
 
 def Calculate_Vmax(Penv,Pc,coef):
     """
@@ -60,36 +69,21 @@ def Calculate_Pressure(Vmax10,Penv,coef):
     return Pc
 
                   
-def TC_Category(V):
+def TC_Category_array(V):
     """
-    Find the category on the Saffir-Simpson Hurricane Wind Scale
+    Find the category on the Saffir-Simpson Hurricane Wind Scale (see SAFFIR_SIMPSON)
 
     Parameters
     ----------
-    V : max wind speed (m/s).
+    V : array of max wind speed (m/s).
 
     Returns
     -------
-    cat : category (0-5, 0=Tropical Storm).
+    cat : array of categories (0-5, 0=Tropical Storm, -1=below Tropical Storm).
 
     """
-    if V>=15.8 and V<29.:
-        cat=0
-    elif V>=29. and V<37.6:
-        cat=1
-    elif V>=37.6 and V<43.4:
-        cat=2
-    elif V>=43.4 and V<51.1:
-        cat=3
-    elif V>=51.1 and V<61.6:
-        cat=4
-    elif V>=61.6:
-        cat=5
-    
-    else:
-        cat=-1
-    
-    return cat
+    V=np.asarray(V,dtype=float)
+    return np.where(np.isnan(V),-1,np.digitize(V,SAFFIR_SIMPSON)-1)
 
 def find_index_pressure(basin,lat,lon,lat0,lon0,lon1):
     """
@@ -116,6 +110,26 @@ def find_index_pressure(basin,lat,lon,lat0,lon0,lon1):
     ind=latindex*maxlon+lonindex
     return ind
     
+def find_index_penv(lat,lon):
+    """
+    Find the index of the nearest point in the 0.25 deg MSLP field (lat0=90 deg, lon0=0 deg, len(lat)=721, len(lon)=1440).
+    On a tie, the point with the lowest index is taken.
+
+    Parameters
+    ----------
+    lat : latitude position(s) of TC.
+    lon : longitude position(s) of TC.
+
+    Returns
+    -------
+    lat_dummy : row index (or array of row indices).
+    lon_dummy : column index (or array of column indices).
+
+    """
+    lat_dummy=np.clip(np.ceil((90.-np.asarray(lat,dtype=float))*4.-0.5),0,720).astype(int)
+    lon_dummy=np.clip(np.ceil(np.asarray(lon,dtype=float)*4.-0.5),0,1439).astype(int)
+    return lat_dummy,lon_dummy
+
 def PRESSURE_JAMES_MASON(dp,pres,a,b,c,d,mpi):
     """
     Function to calculate the change in pressure
@@ -147,19 +161,19 @@ def haversine(lat1,lon1,lat2,lon2):
     ----------
     lat1 : latitude point 1.
     lon1 : longitude point 1.
-    lat2 : latitude point 2.
-    lon2 : longitude point 2.
+    lat2 : latitude point 2 (or array of latitudes).
+    lon2 : longitude point 2 (or array of longitudes).
 
     Returns
     -------
-    km : distance in km.
+    km : distance in km (or array of distances).
 
     """
-    lon1,lat1,lon2,lat2=map(radians,[lon1,lat1,lon2,lat2])
-    dlon=abs(lon1-lon2)
-    dlat=abs(lat2-lat1)
-    A1=sin(dlat/2)**2.+cos(lat1)*cos(lat2)*sin(dlon/2)**2.
-    C2=2.*asin(sqrt(A1))
+    lon1,lat1,lon2,lat2=map(np.radians,[lon1,lat1,lon2,lat2])
+    dlon=np.abs(lon1-lon2)
+    dlat=np.abs(lat2-lat1)
+    A1=np.sin(dlat/2)**2.+np.cos(lat1)*np.cos(lat2)*np.sin(dlon/2)**2.
+    C2=2.*np.arcsin(np.sqrt(A1))
     r=6371.
     km=C2*r
     
@@ -168,6 +182,8 @@ def haversine(lat1,lon1,lat2,lon2):
 def decay_after_landfall(lat_landfall,lon_landfall,latlijst,lonlijst,p,coef,Penv):
     """
     Function to calculate the decay after landfall. From Kaplan&DeMaria 1995
+    The decay is calculated for all time steps of the track after landfall at once, and the series is cut
+    at the first time step with a wind speed below 18 m/s (35 kt).
     
     Input:
         prev_lat,prev_lon: previous latitude and longitude (one time step before landfall)
@@ -194,91 +210,108 @@ def decay_after_landfall(lat_landfall,lon_landfall,latlijst,lonlijst,p,coef,Penv
     alpha=0.095 #h-1
     vb=26.7 #kt at R=0.9
     
+    STORM_METRICS.count('landfall_decays')
+    
     v0=Calculate_Vmax(Penv,p,coef)  #wind speed in m/s 
     
-    wind_decay=[]
-    pressure_decay=[]
-    pressure_decay.append(p)
-    wind_decay.append(v0)
+    pressure_decay=[p]
+    wind_decay=[v0]
     
     v0=v0/0.5144444444 #wind speed at landfall, in kt
     D0=1. # km
     
-    v=v0
-    t=3
-    j=1
-    pres_landfall=p
+    #time steps after landfall until the storm moves out of the basin, 3-hourly data
+    n=len(latlijst)-1
+    if n<=0:
+        return pressure_decay,wind_decay
+    t=np.arange(3.,3.*n+1.,3.)
+    
+    #D is given in km. While D<=1 km, the storm is stationary at the landfall location
+    D=haversine(lat_landfall,lon_landfall,np.asarray(latlijst[1:],dtype=float),np.asarray(lonlijst[1:],dtype=float))
+    moving=D>1.
+    
+    #wind speed for all time steps (with D=D0 while stationary, these values are not used)
+    M=C1*t*(t0-t)
+    b_KM=D1*t*(t0-t)
+    C_KM=M*np.log(np.where(moving,D,D0)/D0)+b_KM
+    v=vb+(R*v0-vb)*np.exp(-alpha*t)-C_KM # v in kt
+    
+    #the storm has dissipated at the first moving time step with a wind speed lower than 18 m/s
+    dissipated=moving & (v*0.51444<18.)
+    if dissipated.any():
+        end=int(np.argmax(dissipated))+1
+        v,moving=v[:end],moving[:end]
+    
+    with np.errstate(invalid='ignore'): #nan for negative wind speeds, as in the scalar formula
+        pressure=np.round(Calculate_Pressure(v*0.514444,Penv,coef),1) #v in m/s
+    wind=v*0.514444 #v in m/s
+    if not moving.all(): #while stationary, the pressure of the last moving time step (or the landfall pressure) and the landfall wind are kept
+        last=np.maximum.accumulate(np.where(moving,np.arange(len(v)),-1))
+        pressure=np.where(moving,pressure,np.where(last>=0,pressure[np.maximum(last,0)],p))
+        wind=np.where(moving,wind,v0*0.5144444)
+    
+    pressure_decay.extend(pressure.tolist())
+    wind_decay.extend(wind.tolist())
     
-    while v>35 or j<len(latlijst): #While the storm hasn't dissipated (wind speed lower
-        #than 18m/s or, equivalently, 35 kt) or moved out of the basin, proceed
-        
-        #Distance needs to be greater than 1. So this means that we are going to look at moments AFTER landfall
-        try:
-            D=haversine(lat_landfall,lon_landfall,latlijst[j],lonlijst[j])
-            #D is given in km 
-            
-            if D==0.: #storm is stationairy at the landfall location
-                pressure_decay.append(pres_landfall)
-                wind_decay.append(v0*0.5144444) #v in m/s
-                j=j+1
-                t=t+3
-                
-            if D>1:
-                M=C1*t*(t0-t)
-                
-                b_KM=D1*t*(t0-t)
-                
-                C_KM=M*np.log(D/D0)+b_KM
-                
-                v=vb+(R*v0-vb)*np.exp(-alpha*t)-C_KM # v in kt
-                            
-                pres_landfall=Calculate_Pressure(v*0.514444,Penv,coef) #v in m/s
-                                
-                pres_landfall=round(pres_landfall,1)
-                
-                pressure_decay.append(pres_landfall)
-                wind_decay.append(v*0.514444) #v in m/s
-                
-                if v*0.51444<18.:
-                    return pressure_decay, wind_decay
-                else:
-                    t=t+3 #we have 3-hourly data, so time after landfall = t=t+3
-                    j=j+1 #index of remainder of lat/lon list after landfall 
-            else:
-                v=-100.
-        except IndexError: #in this case, the storm has moved out of the basin
-            v=-100.
-     
     return pressure_decay,wind_decay   
 
-def distance_from_coast(lon,lat,fpath,degree_in_km=111.12):
+def add_tracks_to_TC_data(pressure,wind,rmax,lat,lon,landfall,offsets,year,storm_number,month,idx,TC_data,context):
     """
-    Calculate the distance from coast
+    Add the time steps of finished TCs to the TC data as one block of rows. The category, distance to land and
+    the columns that are constant per TC are calculated for all time steps at once.
 
     Parameters
     ----------
-    lon : longitude position of TC.
-    lat : latitude position of TC.
-    fpath : land/sea mask.
-    degree_in_km : The default is 111.12.
+    pressure : flat array of pressure (hPa) of all TCs.
+    wind : flat array of wind (m/s).
+    rmax : flat array of radius to maximum winds (km).
+    lat : flat array of latitude coordinates.
+    lon : flat array of longitude coordinates.
+    landfall : flat array of landfall (0=no 1=yes).
+    offsets : TC number k is stored in [offsets[k]:offsets[k+1]].
+    year : year of every TC.
+    storm_number : TC storm number of every TC.
+    month : month of every TC.
+    idx : basin idx.
+    TC_data : existing list of TC data (or STORM_OUTPUT.TrackWriter) to which will be appended.
+    context : SimulationContext of the basin.
 
     Returns
     -------
-    mindist : distance to coast in km.
+    TC_data : TC data + new rows.
 
     """
-    if lon>180:
-        lon=lon-360.
-
-    D = np.load(fpath,encoding = 'latin1',allow_pickle=True).tolist()
-
-    lons,lats = D['lons'],D['lats']
-
-    dists = np.sqrt((lons-lon)**2+(lats-lat)**2)
-    mindist=np.min(dists)*degree_in_km
-    return mindist  
+    offsets=np.asarray(offsets)
+    lengths=np.diff(offsets)
+    landfall=np.asarray(landfall,dtype=float)
+
+    #distance to coast for all time steps (one lookup in the precomputed raster), 0 at landfall
+    distance=distance_from_coast_track(lon,lat,context.lat1,context.lon0,context.distance_to_coast())
+    distance[landfall==1.]=0
+
+    #rows [year,month,storm number,time step,basin id,lat,lon,pressure,wind,rmax,category,landfall flag,distance to land]
+    block=np.empty((offsets[-1],13))
+    block[:,0]=np.repeat(year,lengths)
+    block[:,1]=np.repeat(month,lengths)
+    block[:,2]=np.repeat(storm_number,lengths)
+    block[:,3]=np.arange(offsets[-1])-np.repeat(offsets[:-1],lengths)
+    block[:,4]=idx
+    block[:,5]=lat
+    block[:,6]=lon
+    block[:,7]=pressure
+    block[:,8]=wind
+    block[:,9]=rmax
+    block[:,10]=TC_Category_array(wind)
+    block[:,11]=landfall
+    block[:,12]=distance
+
+    if hasattr(TC_data,'append_block'):
+        TC_data.append_block(block)
+    else:
+        TC_data.extend(block.tolist())
+    return TC_data
 
-def add_parameters_to_TC_data(pressure_list,wind_list,latfull,lonfull,year,storm_number,month,basin,landfallfull,lijst,TC_data,idx):
+def add_parameters_to_TC_data(pressure_list,wind_list,latfull,lonfull,year,storm_number,month,basin,landfallfull,lijst,TC_data,idx,context=None,rng=None,rmax_list=None):
     """
     Add parameters to the TC data list when TC is dissipated/moved out of basin
 
@@ -294,32 +327,31 @@ def add_parameters_to_TC_data(pressure_list,wind_list,latfull,lonfull,year,storm
     basin : basin.
     landfallfull : array of landfall (0=no 1=yes).
     lijst : dummy indicating the duration of the TC.
-    TC_data : existing array of TC data to which will be appended.
+    TC_data : existing list of TC data (or STORM_OUTPUT.TrackWriter) to which will be appended.
     idx : basin idx.
+    context : SimulationContext of the basin. The default is the (cached) context of the basin.
+    rng : numpy.random.Generator. The default is a new, unseeded generator.
+    rmax_list : radius to maximum winds (km) of every time step. The default is None, the radii are sampled with Add_Rmax.
 
     Returns
     -------
     TC_data : array of TC data.
 
     """
-    rmax_list=Add_Rmax(pressure_list)
+    if context is None:
+        context=get_context(basin)
+    if rng is None:
+        rng=np.random.default_rng()
+        
+    if rmax_list is None:
+        with STORM_METRICS.stage('rmax'):
+            rmax_list=Add_Rmax(pressure_list,context,rng)
     
     x=min(len(landfallfull),len(lijst))    
-             
-    for l in range(0,x):
-        if landfallfull[l]==1.:
-            distance=0
-        else:
-            distance=distance_from_coast(lonfull[l],latfull[l],(os.path.join(dir_path,'coastal_basemap_data.npy')))
-            
-        category=TC_Category(wind_list[l])
-        
-        TC_data.append([year,month,storm_number,l,idx,latfull[l],lonfull[l],pressure_list[l],wind_list[l],rmax_list[l],category,landfallfull[l],distance])
     
+    return add_tracks_to_TC_data(pressure_list[:x],wind_list[:x],rmax_list[:x],latfull[:x],lonfull[:x],landfallfull[:x],[0,x],[year],[storm_number],[month],idx,TC_data,context)
 
-    return TC_data
-
-def TC_pressure(basin,latlist,lonlist,landfalllist,year,storms,monthlist,TC_data):  
+def TC_pressure(basin,latlist,lonlist,landfalllist,year,storms,monthlist,TC_data,context=None,rng=None,max_restarts=MAX_RESTARTS,restart_policy='discard'):  
     """
     Calculate TC pressure
 
@@ -332,74 +364,99 @@ def TC_pressure(basin,latlist,lonlist,landfalllist,year,storms,monthlist,TC_data
     year : year
     storms : number of storms.
     monthlist : months of TC occurrence.
-    TC_data : array of TC data.
+    TC_data : list of TC data, or a STORM_OUTPUT.TrackWriter that streams the rows to the output file.
+    context : SimulationContext of the basin. The default is the (cached) context of the basin.
+    rng : numpy.random.Generator. The default is a new, unseeded generator.
+    max_restarts : number of restarts of a TC with an unrealistic pressure (None for no limit). The default is MAX_RESTARTS.
+    restart_policy : 'discard' or 'clamp', what to do with a TC that exceeds max_restarts (see RESTART_POLICIES). The default is 'discard'.
 
     Returns
     -------
     TC_data : array of TC data + new TCs
 
     """
-
-    basin_name = dict(zip(['EP','NA','NI','SI','SP','WP'],[0,1,2,3,4,5]))
+    if context is None:
+        context=get_context(basin)
+    if rng is None:
+        rng=np.random.default_rng()
+    if max_restarts is None:
+        max_restarts=np.inf
     
-    idx=basin_name[basin]
-
-    latidx_penv=np.linspace(90,-90,721)
-    lonidx_penv=np.linspace(0,359.75,1440)    
-    
-    JM_pressure=np.load(os.path.join(__location__,'COEFFICIENTS_JM_PRESSURE.npy'), allow_pickle=True).item()
-            
-    Genpres=np.load(os.path.join(__location__,'DP0_PRES_GENESIS.npy'), allow_pickle=True).item()
-            
-    WPR_coefficients=np.load(os.path.join(__location__,'COEFFICIENTS_WPR_PER_MONTH.npy'), allow_pickle=True).item()
-    
-    Genwind=np.load(os.path.join(__location__,'GENESIS_WIND.npy'), allow_pickle=True).item()
+    idx=context.idx
 
     intlist=[5,3,2,5,5,5]
     
     int_thres=intlist[idx]
        
-    s,monthdummy,lat0,lat1,lon0,lon1=Basins_WMO(basin)
+    lat0,lat1,lon0,lon1=context.lat0,context.lat1,context.lon0,context.lon1
     
     wind_threshold=18. #if vmax<18, the storm is a tropical depression and we stop tracking it.
 
     for storm_number,month,latfull,lonfull,landfallfull in zip(range(0,int(storms)),monthlist,latlist,lonlist,landfalllist):
+        STORM_METRICS.count('storms')
         i=0
         vmax=0
         count=0
         p=np.nan
+        restarts=0
+        started=False
+        clamped=False #the pressure was clamped after the restart budget was used up
         
-        #This is the full MSLP field, with lat0=90 deg, lat1=-90 deg, lon0=0 deg, lon1=359.75 deg. len(lat)=721, len(lon)=1440
-        Penv_field=np.loadtxt(os.path.join(dir_path,'Monthly_mean_MSLP_'+str(month)+'.txt'))
+        #MSLP field over the basin, cut out of the 0.25 deg MSLP field at row0,col0. Penv_list is the environmental pressure along the track
+        Penv_field,row0,col0=context.Penv(month)
+        lat_dummy,lon_dummy=find_index_penv(latfull,lonfull)
+        Penv_list=Penv_field[np.clip(lat_dummy-row0,0,Penv_field.shape[0]-1),np.clip(lon_dummy-col0,0,Penv_field.shape[1]-1)]
                
-        constants_pressure=JM_pressure[idx][month]
-        constants_pressure=np.array(constants_pressure)
+        constants_pressure=context.JM_pressure[month]
         
-        coef=WPR_coefficients[idx][month]
-        coef=np.array(coef)
+        coef=context.WPR_coefficients[month]
         
         p_threshold=min(constants_pressure[:,6])-10.
         
-        EP=Genpres[idx][month]
+        EP=context.genesis_pressure[month]
         
 
         while i<len(latfull): 
             lat,lon,landfall=latfull[i],lonfull[i],landfallfull[i]
             
-            lat_dummy=np.abs(latidx_penv-lat).argmin()
-            lon_dummy=np.abs(lonidx_penv-lon).argmin()
-            
-            Penv=Penv_field[lat_dummy,lon_dummy]           
+            Penv=Penv_list[i] #points outside the basin get the Penv of the basin edge, they are not used
             
             if lat0<=lat<=lat1 and lon0<=lon<=lon1: #make sure we're inside the basin
+                STORM_METRICS.count('steps')
+                
+                if started and restarts>=max_restarts and restart_policy=='clamp' and ((p<p_threshold) | math.isnan(p)):
+                    if not clamped:
+                        print('TC clamped after',restarts,'restarts: basin',basin,'year',year,'storm',storm_number,'pressure',p,'p_threshold',p_threshold)
+                        STORM_METRICS.count('exhausted_storms')
+                        clamped=True
+                    p=clamp_pressure(p,p_threshold) #the restart budget is used up, keep the TC at the lowest realistic pressure
+                    STORM_METRICS.count('clamped')
                 
                 if ((p<p_threshold) | math.isnan(p)): #something went wrong. start again
+                    if started: #not at genesis
+                        restarts=restarts+1
+                        STORM_METRICS.count('restarts')
+                        if restarts==1:
+                            STORM_METRICS.count('restarted_storms')
+                    if restarts>max_restarts:
+                        print('TC discarded after',max_restarts,'restarts: basin',basin,'year',year,'storm',storm_number,'pressure',p,'p_threshold',p_threshold)
+                        STORM_METRICS.count('discarded')
+                        STORM_METRICS.count('exhausted_storms')
+                        i=10000000000000000000000000.
+                        break
                     i=0
                     vmax=0
                     
                 if i==0: 
-                    vmax=random.choice(Genwind[idx][month])
+                    started=True
+                    vmax=rng.choice(context.genesis_wind[month])
                     p=Calculate_Pressure(vmax,Penv,coef)
+                    if restarts>=max_restarts and restart_policy=='clamp' and ((p<p_threshold) | math.isnan(p)):
+                        if not clamped:
+                            print('TC clamped after',restarts,'restarts: basin',basin,'year',year,'storm',storm_number,'pressure',p,'p_threshold',p_threshold)
+                            STORM_METRICS.count('exhausted_storms')
+                            clamped=True
+                        p=float(clamp_pressure(p,p_threshold))
                     
                     
                     pressure_list=[]    
@@ -407,7 +464,7 @@ def TC_pressure(basin,latlist,lonlist,landfalllist,year,storms,monthlist,TC_data
                     #at genesis, we need to sample the genesis pressure and dp1. This is done basin-wide:
                     
                     [Pmu,Pstd,DP0mu,DP0std,dpmin,dpmax]=EP
-                    dp0=np.random.normal(DP0mu,DP0std)
+                    dp0=rng.normal(DP0mu,DP0std)
 
                     dp1=-1.*np.abs(dp0)
 
@@ -426,7 +483,7 @@ def TC_pressure(basin,latlist,lonlist,landfalllist,year,storms,monthlist,TC_data
                     	
                      
                     elif vmax<wind_threshold or p>Penv: #The storm makes landfall as a tropical depression
-                        TC_data=add_parameters_to_TC_data(pressure_list,wind_list,latfull,lonfull,year,storm_number,month,basin,landfallfull,pressure_list,TC_data,idx)
+                        TC_data=add_parameters_to_TC_data(pressure_list,wind_list,latfull,lonfull,year,storm_number,month,basin,landfallfull,pressure_list,TC_data,idx,context,rng)
                         i=1000000000000000 
                      
                     else:
@@ -436,22 +493,7 @@ def TC_pressure(basin,latlist,lonlist,landfalllist,year,storms,monthlist,TC_data
                       
                       [c0,c1,c2,c3,EPmu,EPstd,mpi]=constants_pressure[ind]
                       y=PRESSURE_JAMES_MASON(dp1,p,c0,c1,c2,c3,mpi) 
-                      epsilon=np.random.normal(EPmu,EPstd)
-                      dp0=float(y+epsilon)
-                      
-                      while dp0<dpmin: #if more intensification than seen in the underlying dataset
-                          if y-dpmin>EPmu-2.*EPstd: #epsilon should be resampled
-                              epsilon=np.random.normal(EPmu,EPstd)
-                              dp0=y+epsilon
-                          else: #y is already smaller than dpmin. 
-                              dp0=np.random.uniform(dpmin,0)
-                      
-                      while dp0>dpmax: #if more weakening than seen in the underlying dataset
-                          if y-dpmax<EPmu+2.*EPstd:
-                              epsilon=np.random.normal(EPmu,EPstd)
-                              dp0=y+epsilon
-                          else:
-                              dp0=np.random.uniform(0,dpmax)      
+                      dp0=sample_pressure_change(y,EPmu,EPstd,dpmin,dpmax,rng) #keep dp0 between dpmin and dpmax
                       
                       if p<mpi:#if pressure has dropped below mpi
                           if dp0<0: #if intensification
@@ -468,7 +510,7 @@ def TC_pressure(basin,latlist,lonlist,landfalllist,year,storms,monthlist,TC_data
                       
                       if vmax<wind_threshold or p>Penv: #The storm is no longer a tropical storm
                           #print('Dissipated',len(pressure_list),len(landfallfull))
-                          TC_data=add_parameters_to_TC_data(pressure_list,wind_list,latfull,lonfull,year,storm_number,month,basin,landfallfull,pressure_list,TC_data,idx)
+                          TC_data=add_parameters_to_TC_data(pressure_list,wind_list,latfull,lonfull,year,storm_number,month,basin,landfallfull,pressure_list,TC_data,idx,context,rng)
                           i=10000000000000000000000000000000
                         
                       else:
@@ -478,7 +520,10 @@ def TC_pressure(basin,latlist,lonlist,landfalllist,year,storms,monthlist,TC_data
                           vmax=round(vmax,1)
                           wind_list.append(vmax)
   
-                    if any(c<1 for c in landfallfull[i:]): #check whether the storm moves back over the ocean
+                    if i>=len(latfull): #the TC dissipated at landfall and was added to TC_data above, so there is nothing to decay
+                        pass
+
+                    elif any(c<1 for c in landfallfull[i:]): #check whether the storm moves back over the ocean
                         
                         check_move_ocean=i+np.where(np.array(landfallfull[i:])==0.)[0][0]
                         #storm moves back over open ocean: apply decay function for i till check_move_ocean
@@ -492,7 +537,7 @@ def TC_pressure(basin,latlist,lonlist,landfalllist,year,storms,monthlist,TC_data
 
                         #if the storm has decayed before moving back over the ocean:    
                         if wind_list[-1]<wind_threshold:
-                            TC_data=add_parameters_to_TC_data(pressure_list,wind_list,latfull,lonfull,year,storm_number,month,basin,landfallfull,pressure_list,TC_data,idx)
+                            TC_data=add_parameters_to_TC_data(pressure_list,wind_list,latfull,lonfull,year,storm_number,month,basin,landfallfull,pressure_list,TC_data,idx,context,rng)
                                                         
                             i=10000000000000000000000000.
                             
@@ -509,7 +554,7 @@ def TC_pressure(basin,latlist,lonlist,landfalllist,year,storms,monthlist,TC_data
                             wind_list.append(decay_wind[d])
                         
                         #print('Decayed over land',len(pressure_list),len(landfallfull))                         
-                        TC_data=add_parameters_to_TC_data(pressure_list,wind_list,latfull,lonfull,year,storm_number,month,basin,landfallfull,pressure_list,TC_data,idx)
+                        TC_data=add_parameters_to_TC_data(pressure_list,wind_list,latfull,lonfull,year,storm_number,month,basin,landfallfull,pressure_list,TC_data,idx,context,rng)
                             
                         i=1000000000000
                    
@@ -521,7 +566,7 @@ def TC_pressure(basin,latlist,lonlist,landfalllist,year,storms,monthlist,TC_data
                         
                     elif vmax<wind_threshold or p>Penv and i>3: #The storm is no longer a tropical storm
                         #print('Dissipated',len(pressure_list),len(landfallfull))
-                        TC_data=add_parameters_to_TC_data(pressure_list,wind_list,latfull,lonfull,year,storm_number,month,basin,landfallfull,pressure_list,TC_data,idx)
+                        TC_data=add_parameters_to_TC_data(pressure_list,wind_list,latfull,lonfull,year,storm_number,month,basin,landfallfull,pressure_list,TC_data,idx,context,rng)
                         
                         i=1000000000000000                       
                         
@@ -532,24 +577,7 @@ def TC_pressure(basin,latlist,lonlist,landfalllist,year,storms,monthlist,TC_data
                         
                         y=PRESSURE_JAMES_MASON(dp1,p,c0,c1,c2,c3,mpi) 
                         
-                        epsilon=np.random.normal(EPmu,EPstd)
-
-                        dp0=float(y+epsilon)  
-
-                        
-                        while dp0<dpmin: #if more intensification than seen in the underlying dataset
-                            if y-dpmin>EPmu-2.*EPstd: #epsilon should be resampled
-                                epsilon=np.random.normal(EPmu,EPstd)
-                                dp0=y+epsilon
-                            else: #y is already smaller than dpmin. 
-                                dp0=np.random.uniform(dpmin,0)
-                        
-                        while dp0>dpmax: #if more weakening than seen in the underlying dataset
-                            if y-dpmax<EPmu+2.*EPstd:
-                                epsilon=np.random.normal(EPmu,EPstd)
-                                dp0=y+epsilon
-                            else:
-                                dp0=np.random.uniform(0,dpmax)  
+                        dp0=sample_pressure_change(y,EPmu,EPstd,dpmin,dpmax,rng) #keep dp0 between dpmin and dpmax
                                 
                         if p<mpi:#if pressure has dropped below mpi
                             if dp0<0: #if intensification
@@ -568,7 +596,7 @@ def TC_pressure(basin,latlist,lonlist,landfalllist,year,storms,monthlist,TC_data
                         
                         if vmax<wind_threshold or p>Penv: #The storm is no longer a tropical storm
                           #print('Dissipated',len(pressure_list),len(landfallfull))
-                          TC_data=add_parameters_to_TC_data(pressure_list,wind_list,latfull,lonfull,year,storm_number,month,basin,landfallfull,pressure_list,TC_data,idx)
+                          TC_data=add_parameters_to_TC_data(pressure_list,wind_list,latfull,lonfull,year,storm_number,month,basin,landfallfull,pressure_list,TC_data,idx,context,rng)
                           i=10000000000000000000000000000000
                         
                         else:
@@ -581,11 +609,386 @@ def TC_pressure(basin,latlist,lonlist,landfalllist,year,storms,monthlist,TC_data
                           i=i+1 
                         
             else: #we are outside the basin. Move on to the next storm
-                TC_data=add_parameters_to_TC_data(pressure_list,wind_list,latfull,lonfull,year,storm_number,month,basin,landfallfull,pressure_list,TC_data,idx)                
+                TC_data=add_parameters_to_TC_data(pressure_list,wind_list,latfull,lonfull,year,storm_number,month,basin,landfallfull,pressure_list,TC_data,idx,context,rng)                
                 i=100000000000000000.
                 
         if i==len(latfull):
-            TC_data=add_parameters_to_TC_data(pressure_list,wind_list,latfull,lonfull,year,storm_number,month,basin,landfallfull,pressure_list,TC_data,idx)
+            TC_data=add_parameters_to_TC_data(pressure_list,wind_list,latfull,lonfull,year,storm_number,month,basin,landfallfull,pressure_list,TC_data,idx,context,rng)
            
     return(TC_data)
 
+
+def clamp_pressure(p,p_threshold):
+    """
+    Clamp unrealistic pressures (below p_threshold, or nan) to p_threshold
+
+    Parameters
+    ----------
+    p : pressure(s) (hPa).
+    p_threshold : lowest realistic pressure(s) (hPa).
+
+    Returns
+    -------
+    p : clamped pressure(s).
+
+    """
+    return np.where((p<p_threshold) | np.isnan(p),p_threshold,p)
+
+def find_index_pressure_array(lat,lon,lat0,lon0,lon1):
+    """
+    find_index_pressure for arrays of positions
+
+    Parameters
+    ----------
+    lat : array of latitude positions of TCs.
+    lon : array of longitude positions of TCs.
+    lat0 : upper left corner latitude of basin.
+    lon0 : upper left corner longitude of basin.
+    lon1 : upper right corner longitude of basin.
+
+    Returns
+    -------
+    ind : array of indices.
+
+    """
+    base=5
+    latindex=np.floor((lat-lat0)/base)
+    lonindex=np.floor((lon-lon0)/base)
+    maxlon=(lon1-lon0)/5.
+    ind=(latindex*maxlon+lonindex).astype(int)
+    return ind
+
+def landfall_step(i,p,vmax,dp1,count,pressure_list,wind_list,lat,lon,Penv,latfull,lonfull,landfallfull,constants_pressure,coef,dpmin,dpmax,p_threshold,lat0,lon0,lon1,rng):
+    """
+    Pressure of a TC that makes landfall at track point i: one James-Mason step, followed by the
+    decay formula of Kaplan and DeMaria over land (see decay_after_landfall)
+
+    Parameters
+    ----------
+    i : index of the current track point.
+    p,vmax,dp1,count : pressure, wind, previous pressure change and intensification counter of the TC.
+    pressure_list,wind_list : lists of pressure and wind of the TC, the new values are appended.
+    lat,lon,Penv : position and environmental pressure at track point i.
+    latfull,lonfull,landfallfull : track of the TC.
+    constants_pressure : James-Mason coefficients of the month.
+    coef : wind-pressure coefficients of the month.
+    dpmin,dpmax : minimum and maximum pressure change of the month.
+    p_threshold : lowest realistic pressure of the month.
+    lat0,lon0,lon1 : basin boundaries.
+    rng : numpy.random.Generator.
+
+    Returns
+    -------
+    status : 'restart', 'dissipated' or 'ocean' (the TC moves back over the ocean at track point i).
+    i,p,vmax,dp1,count : new state of the TC.
+
+    """
+    wind_threshold=18.
+
+    if ((p<p_threshold) | math.isnan(p)):
+        return 'restart',0,p,0,dp1,count
+
+    if vmax<wind_threshold or p>Penv: #The storm makes landfall as a tropical depression
+        return 'dissipated',i,p,vmax,dp1,count
+
+    #calculate the landfall pressure
+    ind=int(find_index_pressure(None,lat,lon,lat0,lon0,lon1)) #find index for pressure
+    [c0,c1,c2,c3,EPmu,EPstd,mpi]=constants_pressure[ind]
+    y=PRESSURE_JAMES_MASON(dp1,p,c0,c1,c2,c3,mpi)
+    dp0=sample_pressure_change(y,EPmu,EPstd,dpmin,dpmax,rng) #keep dp0 between dpmin and dpmax
+
+    if p<mpi:#if pressure has dropped below mpi
+        if dp0<0: #if intensification
+            if count<2: #if intensification has been going on for less than 2 time steps
+                count=count+1
+            else:
+                dp0=abs(dp0)
+    else: #the storm is above mpi
+        count=0
+
+    p=round(dp0+p,1)
+    dp1=dp0
+
+    if vmax<wind_threshold or p>Penv: #The storm is no longer a tropical storm
+        return 'dissipated',i,p,vmax,dp1,count
+
+    pressure_list.append(p)
+    vmax=round(Calculate_Vmax(Penv,p,coef),1)
+    wind_list.append(vmax)
+
+    ocean=np.where(np.array(landfallfull[i:])==0.)[0]
+    if len(ocean)==0: #the storm does not move back over open ocean, so use the decay function until the storm has dissipated
+        decay_pressure,decay_wind=decay_after_landfall(lat,lon,latfull[i:],lonfull[i:],p,coef,Penv)
+        pressure_list.extend(decay_pressure)
+        wind_list.extend(decay_wind)
+        return 'dissipated',i,p,vmax,dp1,count
+
+    check_move_ocean=i+ocean[0]
+    #storm moves back over open ocean: apply decay function for i till check_move_ocean
+    if check_move_ocean>i+3: #if this is not the case, we're crossing a very small island and no decay function should be used then
+        decay_pressure,decay_wind=decay_after_landfall(lat,lon,latfull[i:i+check_move_ocean],lonfull[i:i+check_move_ocean],p,coef,Penv)
+        pressure_list.extend(decay_pressure)
+        wind_list.extend(decay_wind)
+
+    #if the storm has decayed before moving back over the ocean:
+    if wind_list[-1]<wind_threshold:
+        return 'dissipated',i,p,vmax,dp1,count
+
+    dp1=pressure_list[-1]-pressure_list[-2]
+    p=pressure_list[-1]
+    return 'ocean',check_move_ocean,p,vmax,dp1,count
+
+def TC_pressure_batch(basin,latlist,lonlist,landfalllist,yearlist,monthlist,TC_data,context=None,rng=None,max_restarts=MAX_RESTARTS,restart_policy='discard',restart_log=None):
+    """
+    Batched version of TC_pressure. The pressure of all TCs that are over the ocean (e.g. of one year, or of a
+    block of years) is advanced in lockstep with the James-Mason formula, with the coefficients gathered per TC
+    from the coefficient tables. TCs that make landfall are handled one by one (see landfall_step) and join the
+    lockstep again when they move back over the ocean.
+
+    Parameters
+    ----------
+    basin : basin.
+    latlist : list of TC track latitude positions (one array per TC), or a TRACKS.Tracks with the tracks of all TCs
+        (as returned by TC_movement_batch with ragged=True). lonlist and landfalllist are not used for a Tracks.
+    lonlist : list of TC track longitude positions.
+    landfalllist : list of TC landfall (0=no 1=yes).
+    yearlist : year of every TC. The TCs are sorted by year, and numbered per year.
+    monthlist : month of every TC.
+    TC_data : list of TC data, or a STORM_OUTPUT.TrackWriter that streams the rows to the output file.
+    context : SimulationContext of the basin. The default is the (cached) context of the basin.
+    rng : numpy.random.Generator. The default is a new, unseeded generator.
+    max_restarts : number of restarts of a TC with an unrealistic pressure (None for no limit). The default is MAX_RESTARTS.
+    restart_policy : 'discard' or 'clamp', what to do with a TC that exceeds max_restarts (see RESTART_POLICIES). The default is 'discard'.
+    restart_log : list to which [year,month,storm number,restarts,fallback] is appended for every TC that was restarted,
+        in the order of the input. fallback is 'discard' or 'clamp' if the TC used up max_restarts and was finalized by
+        the restart policy, otherwise None. The default is None (no log).
+
+    Returns
+    -------
+    TC_data : TC data + new TCs
+
+    """
+    if context is None:
+        context=get_context(basin)
+    if rng is None:
+        rng=np.random.default_rng()
+    if max_restarts is None:
+        max_restarts=np.inf
+
+    n=len(latlist)
+    if n==0:
+        return TC_data
+    STORM_METRICS.count('storms',n)
+
+    idx=context.idx
+
+    intlist=[5,3,2,5,5,5]
+
+    int_thres=intlist[idx]
+
+    lat0,lat1,lon0,lon1=context.lat0,context.lat1,context.lon0,context.lon1
+
+    wind_threshold=18. #if vmax<18, the storm is a tropical depression and we stop tracking it.
+
+    #==============================================================================
+    # Coefficients per TC, gathered from the tables of the months in the batch
+    #==============================================================================
+    months=np.asarray(monthlist)
+    month_list=np.unique(months)
+    m=np.searchsorted(month_list,months) #index of the month of every TC in month_list
+
+    constants_pressure=np.stack([np.asarray(context.JM_pressure[month],dtype=float) for month in month_list]) #[c0,c1,c2,c3,EPmu,EPstd,mpi]
+    coef=np.stack([context.WPR_coefficients[month] for month in month_list])[m].T
+    [Pmu,Pstd,DP0mu,DP0std,dpmin,dpmax]=np.array([context.genesis_pressure[month] for month in month_list],dtype=float)[m].T
+    p_threshold=np.array([min(context.JM_pressure[month][:,6])-10. for month in month_list])[m]
+
+    #==============================================================================
+    # Tracks as flat arrays: TC k is stored in [offsets[k]:offsets[k+1]]
+    #==============================================================================
+    tracks=latlist if isinstance(latlist,Tracks) else tracks_from_lists(latlist,lonlist,landfalllist)
+    lengths=tracks.lengths()
+    offsets=tracks.offsets
+    latflat,lonflat=tracks.coordinates()
+    landfallflat=tracks.landfall.astype(float)
+
+    Penvflat=np.zeros(len(latflat))
+    month_point=np.repeat(months,lengths)
+    lat_dummy,lon_dummy=find_index_penv(latflat,lonflat)
+    for month in month_list:
+        Penv_field,row0,col0=context.Penv(month)
+        k=month_point==month
+        Penvflat[k]=Penv_field[np.clip(lat_dummy[k]-row0,0,Penv_field.shape[0]-1),np.clip(lon_dummy[k]-col0,0,Penv_field.shape[1]-1)]
+
+    #==============================================================================
+    # State of every TC. pressure[k,:npres[k]] and wind[k,:npres[k]] hold the pressure and wind of TC k
+    #==============================================================================
+    i=np.zeros(n,dtype=int)
+    p=np.full(n,np.nan)
+    vmax=np.zeros(n)
+    dp1=np.zeros(n)
+    count=np.zeros(n,dtype=int)
+    pressure=np.zeros((n,max(lengths)))
+    wind=np.zeros((n,max(lengths)))
+    npres=np.zeros(n,dtype=int)
+    restarts=np.zeros(n,dtype=int) #number of restarts after genesis
+    started=np.zeros(n,dtype=bool)
+    fallback=np.zeros(n,dtype=bool) #the TC used up max_restarts and was discarded or clamped
+
+    active=np.arange(n)
+    while len(active)>0:
+        npres[active[i[active]>lengths[active]]]=0 #TCs that step past the end of the track (tracks of one point) are dropped, as in TC_pressure
+        active=active[i[active]<lengths[active]] #TCs at the end of the track are done
+        point=offsets[active]+i[active]
+        lat,lon,landfall,Penv=latflat[point],lonflat[point],landfallflat[point],Penvflat[point]
+
+        inside=(lat0<=lat) & (lat<=lat1) & (lon0<=lon) & (lon<=lon1) #we are outside the basin. Move on to the next storm
+        active,lat,lon,landfall,Penv=active[inside],lat[inside],lon[inside],landfall[inside],Penv[inside]
+        if len(active)==0:
+            break
+        STORM_METRICS.count('steps',len(active))
+
+        #==============================================================================
+        # Genesis, and restart of TCs with an unrealistic pressure (something went wrong)
+        #==============================================================================
+        if restart_policy=='clamp': #the restart budget is used up, keep the TC at the lowest realistic pressure
+            k=active[started[active] & (restarts[active]>=max_restarts)] #TCs before genesis have no pressure yet
+            k=k[(p[k]<p_threshold[k]) | np.isnan(p[k])]
+            STORM_METRICS.count('clamped',len(k))
+            for kk in k[~fallback[k]]:
+                print('TC clamped after',restarts[kk],'restarts: basin',basin,'year',yearlist[kk],'month',months[kk],'pressure',p[kk],'p_threshold',p_threshold[kk])
+            STORM_METRICS.count('exhausted_storms',np.sum(~fallback[k]))
+            fallback[k]=True
+            p[k]=clamp_pressure(p[k],p_threshold[k])
+
+        restart=(p[active]<p_threshold[active]) | np.isnan(p[active])
+        if np.any(restart):
+            k=active[restart]
+            STORM_METRICS.count('restarts',np.sum(started[k]))
+            restarts[k[started[k]]]+=1
+            STORM_METRICS.count('restarted_storms',np.sum(started[k] & (restarts[k]==1)))
+            started[k]=True
+
+            discard=restarts[k]>max_restarts
+            if np.any(discard): #the restart budget is used up
+                for kk in k[discard]:
+                    print('TC discarded after',max_restarts,'restarts: basin',basin,'year',yearlist[kk],'month',months[kk],'pressure',p[kk],'p_threshold',p_threshold[kk])
+                STORM_METRICS.count('discarded',np.sum(discard))
+                STORM_METRICS.count('exhausted_storms',np.sum(discard))
+                fallback[k[discard]]=True
+                npres[k[discard]]=0
+                keep=~np.isin(active,k[discard])
+                active,lat,lon,landfall,Penv,restart=active[keep],lat[keep],lon[keep],landfall[keep],Penv[keep],restart[keep]
+                k=k[~discard]
+
+            for month in np.unique(months[k]):
+                vmax[k[months[k]==month]]=rng.choice(context.genesis_wind[month],np.sum(months[k]==month))
+            p[k]=Calculate_Pressure(vmax[k],Penv[restart],coef[:,k])
+            if restart_policy=='clamp': #the last restart in the budget
+                clamp=k[(restarts[k]>=max_restarts) & ((p[k]<p_threshold[k]) | np.isnan(p[k])) & ~fallback[k]]
+                for kk in clamp:
+                    print('TC clamped after',restarts[kk],'restarts: basin',basin,'year',yearlist[kk],'month',months[kk],'pressure',p[kk],'p_threshold',p_threshold[kk])
+                STORM_METRICS.count('exhausted_storms',len(clamp))
+                fallback[clamp]=True
+                p[k]=np.where(restarts[k]>=max_restarts,clamp_pressure(p[k],p_threshold[k]),p[k])
+            #at genesis, we need to sample the genesis pressure and dp1. This is done basin-wide:
+            dp0=rng.normal(DP0mu[k],DP0std[k])
+            dp1[k]=-1.*np.abs(dp0)
+            pressure[k,0]=p[k]
+            wind[k,0]=vmax[k]
+            npres[k]=1
+            i[k]=1
+
+        done=np.zeros(len(active),dtype=bool)
+
+        #==============================================================================
+        # Landfall: one TC at a time
+        #==============================================================================
+        for j in np.flatnonzero(landfall==1):
+            k=active[j]
+            pressure_list=pressure[k,:npres[k]].tolist()
+            wind_list=wind[k,:npres[k]].tolist()
+            status,i[k],p[k],vmax[k],dp1[k],count[k]=landfall_step(i[k],p[k],vmax[k],dp1[k],count[k],pressure_list,wind_list,lat[j],lon[j],Penv[j],
+                                                                  latflat[offsets[k]:offsets[k+1]],lonflat[offsets[k]:offsets[k+1]],landfallflat[offsets[k]:offsets[k+1]],
+                                                                  constants_pressure[m[k]],coef[:,k],
+                                                                  dpmin[k],dpmax[k],p_threshold[k],lat0,lon0,lon1,rng)
+            if len(pressure_list)>pressure.shape[1]:
+                extra=np.zeros((n,len(pressure_list)-pressure.shape[1]))
+                pressure,wind=np.hstack((pressure,extra)),np.hstack((wind,extra))
+            npres[k]=len(pressure_list)
+            pressure[k,:npres[k]]=pressure_list
+            wind[k,:npres[k]]=wind_list
+            done[j]=status=='dissipated'
+
+        #==============================================================================
+        # Over the ocean: apply the James-Mason formula to all TCs at once
+        #==============================================================================
+        ocean=np.flatnonzero(landfall!=1)
+        k=active[ocean]
+
+        restart=(p[k]<p_threshold[k]) | np.isnan(p[k])
+        i[k[restart]]=0
+        vmax[k[restart]]=0
+
+        dissipated=~restart & ((vmax[k]<wind_threshold) | ((p[k]>Penv[ocean]) & (i[k]>3))) #The storm is no longer a tropical storm
+        done[ocean[dissipated]]=True
+
+        step=~restart & ~dissipated
+        ocean,k=ocean[step],k[step]
+
+        ind=find_index_pressure_array(lat[ocean],lon[ocean],lat0,lon0,lon1) #find index for pressure
+        [c0,c1,c2,c3,EPmu,EPstd,mpi]=constants_pressure[m[k],ind].T
+
+        y=c0+c1*dp1[k]+c2*np.exp(-c3*np.where(p[k]<mpi,0,p[k]-mpi))
+        dp0=sample_pressure_change(y,EPmu,EPstd,dpmin[k],dpmax[k],rng) #keep dp0 between dpmin and dpmax
+
+        #if pressure has dropped below mpi, intensification is allowed for 2 time steps
+        below_mpi=p[k]<mpi
+        intensify=below_mpi & (dp0<0)
+        dp0=np.where(intensify & (count[k]>=2),np.abs(dp0),dp0)
+        count[k]=np.where(intensify & (count[k]<2),count[k]+1,count[k])
+        count[k]=np.where(below_mpi,count[k],0)
+
+        dp0=np.where(i[k]<int_thres,-1.*np.abs(dp0),dp0)
+        p[k]=np.round(dp0+p[k],1)
+        dp1[k]=dp0
+
+        dissipated=(vmax[k]<wind_threshold) | (p[k]>Penv[ocean]) #The storm is no longer a tropical storm
+        done[ocean[dissipated]]=True
+        ocean,k=ocean[~dissipated],k[~dissipated]
+
+        if np.any(npres[k]>=pressure.shape[1]):
+            extra=np.zeros((n,max(lengths)))
+            pressure,wind=np.hstack((pressure,extra)),np.hstack((wind,extra))
+        vmax[k]=np.round(Calculate_Vmax(Penv[ocean],p[k],coef[:,k]),1)
+        pressure[k,npres[k]]=p[k]
+        wind[k,npres[k]]=vmax[k]
+        npres[k]=npres[k]+1
+        i[k]=i[k]+1
+
+        active=active[~done]
+
+    #==============================================================================
+    # Add the TCs to TC_data, in the order of the input
+    #==============================================================================
+    years=np.asarray(yearlist)
+    storm_number=np.arange(n)-np.searchsorted(years,years) #TC number within the year
+
+    if restart_log is not None:
+        for k in np.flatnonzero((restarts>0) | fallback):
+            restart_log.append([int(years[k]),int(months[k]),int(storm_number[k]),int(restarts[k]),restart_policy if fallback[k] else None])
+
+    #radius to maximum winds of all TCs with at least one time step
+    with STORM_METRICS.stage('rmax'):
+        kept=np.flatnonzero(npres>0)
+        rmax=Add_Rmax_batch(pressure[np.arange(pressure.shape[1])<npres[:,None]],np.concatenate(([0],np.cumsum(npres[kept]))),context,rng)
+
+    with STORM_METRICS.stage('output'):
+        #time step j of TC k is written if j<min(track length,number of pressures)
+        x=np.minimum(lengths,npres)
+        step=np.arange(pressure.shape[1])
+        written=step<x[:,None]
+        on_track=np.arange(len(latflat))-np.repeat(offsets[:-1],lengths)<np.repeat(x,lengths)
+        TC_data=add_tracks_to_TC_data(pressure[written],wind[written],rmax[written[step<npres[:,None]]],latflat[on_track],lonflat[on_track],landfallflat[on_track],
+                                      np.concatenate(([0],np.cumsum(x[kept]))),years[kept],storm_number[kept],months[kept],idx,TC_data,context)
+
+    return TC_data
@@ -12,12 +12,13 @@ This is the STORM module for simulation of genesis month, frequency, and basin b
 Copyright (C) 2020 Nadia Bloemendaal. All versions released under the GNU General Public License v3.0
 """
 import numpy as np
-import random
 import os
 import sys
 dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
 __location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
 
+from TEXT_CACHE import load_text
+
 #Basin indices: 
 # 0 = EP = Eastern Pacific
 # 1 = NA = North Atlantic
@@ -26,56 +27,57 @@ __location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file
 # 4 = SP = South Pacific
 # 5 = WP = Western Pacific
 
-def Genesis_month(idx,storms):
+def Genesis_month(idx,storms,rng=None):
     """
     Sample the genesis months for every TC
     Parameters
     ----------
     idx : basin index (0=EP 1=NA 2=NI 3=SI 4=SP 5=WP).
     storms : number of TCs.
+    rng : numpy.random.Generator. The default is a new, unseeded generator.
 
     Returns
     -------
     monthall : list of all genesis months.
 
     """
+    if rng is None:
+        rng=np.random.default_rng()
     monthlist=np.load(os.path.join(__location__,'GENESIS_MONTHS.npy'),allow_pickle=True).item()
     
-    monthall=[]
-    for i in range(0,storms):
-        monthall.append(np.random.choice(monthlist[idx]))
-        
-            
+    monthall=rng.choice(monthlist[idx],storms).tolist()
     
     return monthall
 
 
     
-def Storms(idx): 
+def Storms(idx,rng=None): 
     """
     Sample the number of TC formations in a given year
 
     Parameters
     ----------
     idx : basin index (0=EP 1=NA 2=NI 3=SI 4=SP 5=WP).
+    rng : numpy.random.Generator. The default is a new, unseeded generator.
 
     Returns
     -------
     s : number of storms.
 
     """
-    mu_list=np.loadtxt(os.path.join(__location__,'POISSON_GENESIS_PARAMETERS.txt'))
+    if rng is None:
+        rng=np.random.default_rng()
+    mu_list=load_text(os.path.join(__location__,'POISSON_GENESIS_PARAMETERS.txt'))
     #mu_list has the shape [EP,NA,NI,SI,SP,WP]
     
     mu=mu_list[idx]
 
-    poisson=np.random.poisson(mu,10000)
-    s=random.choice(poisson)
+    s=rng.poisson(mu)
     return s
 
-def Basins_WMO(basin):
+def Basin_boundaries(basin):
     """
-    Basin definitions
+    Basin boundaries
 
     Parameters
     ----------
@@ -83,8 +85,6 @@ def Basins_WMO(basin):
 
     Returns
     -------
-    s : number of storms.
-    month : list of genesis months.
     lat0 : lower left corner latitude.
     lat1 : upper right corner latitude.
     lon0 : lower left corner longitude.
@@ -93,27 +93,87 @@ def Basins_WMO(basin):
     """
     #We follow the basin definitions from the IBTrACS dataset, but with lat boundaries set at 60 N/S
     #The ENP/AO border will be defined in the algorithm later. 
+    if basin=='EP': #Eastern Pacific
+        lat0,lat1,lon0,lon1=5,60,180,285
+    if basin=='NA': #North Atlantic
+        lat0,lat1,lon0,lon1=5,60,255,359
+    if basin=='NI': #North Indian
+        lat0,lat1,lon0,lon1=5,60,30,100
+    if basin=='SI': #South Indian
+        lat0,lat1,lon0,lon1=-60,-5,10,135
+    if basin=='SP': #South Pacific
+        lat0,lat1,lon0,lon1=-60,-5,135,240
+    if basin=='WP': #Western Pacific
+        lat0,lat1,lon0,lon1=5,60,100,180
+        
+    return lat0,lat1,lon0,lon1
+
+def Seasons(basin,years,rng=None,context=None):
+    """
+    Sample the number of TCs and the genesis months of every TC for a number of years at once
+
+    Parameters
+    ----------
+    basin : basin.
+    years : number of years.
+    rng : numpy.random.Generator. The default is a new, unseeded generator.
+    context : SimulationContext of the basin, to take the Poisson parameter and genesis months from. The default loads them from file.
+
+    Returns
+    -------
+    storms : array with the number of TCs per year.
+    months : array with the genesis months of all TCs.
+    offsets : the genesis months of year y are months[offsets[y]:offsets[y+1]].
+
+    """
+    if rng is None:
+        rng=np.random.default_rng()
+    
+    if context is not None:
+        mu,monthlist=context.poisson_mu,context.genesis_months
+    else:
+        basins=['EP','NA','NI','SI','SP','WP']
+        idx=basins.index(basin)
+        mu=load_text(os.path.join(__location__,'POISSON_GENESIS_PARAMETERS.txt'))[idx]
+        monthlist=np.load(os.path.join(__location__,'GENESIS_MONTHS.npy'),allow_pickle=True).item()[idx]
+    
+    storms=rng.poisson(mu,years)
+    months=rng.choice(monthlist,np.sum(storms))
+    offsets=np.concatenate(([0],np.cumsum(storms)))
     
+    return storms,months,offsets
+
+def Basins_WMO(basin,rng=None):
+    """
+    Basin definitions
+
+    Parameters
+    ----------
+    basin : basin.
+    rng : numpy.random.Generator. The default is a new, unseeded generator.
+
+    Returns
+    -------
+    s : number of storms.
+    month : list of genesis months.
+    lat0 : lower left corner latitude.
+    lat1 : upper right corner latitude.
+    lon0 : lower left corner longitude.
+    lon1 : upper right corner longitude.
+
+    """
     basins=['EP','NA','NI','SI','SP','WP']
     basin_name = dict(zip(basins,[0,1,2,3,4,5]))
     idx=basin_name[basin]
     
-    s=Storms(idx)
+    if rng is None:
+        rng=np.random.default_rng()
+    
+    s=Storms(idx,rng)
     
-    month=Genesis_month(idx,s)
+    month=Genesis_month(idx,s,rng)
   
-    if idx==0: #Eastern Pacific
-        lat0,lat1,lon0,lon1=5,60,180,285
-    if idx==1: #North Atlantic
-        lat0,lat1,lon0,lon1=5,60,255,359
-    if idx==2: #North Indian
-        lat0,lat1,lon0,lon1=5,60,30,100
-    if idx==3: #South Indian
-        lat0,lat1,lon0,lon1=-60,-5,10,135
-    if idx==4: #South Pacific
-        lat0,lat1,lon0,lon1=-60,-5,135,240
-    if idx==5: #Western Pacific
-        lat0,lat1,lon0,lon1=5,60,100,180
+    lat0,lat1,lon0,lon1=Basin_boundaries(basin)
         
     return s,month,lat0,lat1,lon0,lon1 
 
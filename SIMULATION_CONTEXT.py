@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+This module is part of the IH-STORM model
+
+For more information, please see
+Bloemendaal, N., Haigh, I.D., de Moel, H. et al.
+Generation of a global synthetic tropical cyclone hazard dataset using STORM.
+Sci Data 7, 40 (2020). https://doi.org/10.1038/s41597-020-0381-2
+
+This is the STORM module that holds the input data of the simulation. The coefficient files,
+land-sea mask, genesis grids and MSLP fields of a basin are parsed once per process and shared
+by Seasons, Startingpoint, TC_movement, TC_pressure and Add_Rmax.
+
+Released under the GNU General Public License v3.0
+"""
+import numpy as np
+import os
+import sys
+dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
+__location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
+
+from SELECT_BASIN import Basin_boundaries
+from COAST_DISTANCE import distance_to_coast_raster
+from LAND_MASK import LandMask
+from TEXT_CACHE import load_text
+
+#Basin indices:
+# 0 = EP = Eastern Pacific
+# 1 = NA = North Atlantic
+# 2 = NI = North Indian
+# 3 = SI = South Indian
+# 4 = SP = South Pacific
+# 5 = WP = Western Pacific
+
+class SimulationContext:
+    """
+    Input data for the simulation of one basin
+
+    Parameters
+    ----------
+    basin : basin (EP,NA,NI,SI,SP,WP).
+    path : directory with the input files.
+
+    """
+    def __init__(self,basin,path=__location__):
+        basins=['EP','NA','NI','SI','SP','WP']
+        basin_name = dict(zip(basins,[0,1,2,3,4,5]))
+
+        self.basin=basin
+        self.idx=basin_name[basin]
+        self.path=path
+        self.lat0,self.lat1,self.lon0,self.lon1=Basin_boundaries(basin)
+
+        idx=self.idx
+
+        #Poisson parameter of the yearly number of TCs and the observed genesis months
+        self.poisson_mu=load_text(os.path.join(path,'POISSON_GENESIS_PARAMETERS.txt'))[idx]
+        self.genesis_months=np.array(np.load(os.path.join(path,'GENESIS_MONTHS.npy'),allow_pickle=True).item()[idx])
+
+        #track coefficients per 5 deg latitude bin: [a0,a1,b0,b1,b2,Elatmu,Elatstd,Elonmu,Elonstd,Dlat0mu,Dlat0std,Dlon0mu,Dlon0std]
+        constants_all=np.load(os.path.join(path,'TRACK_COEFFICIENTS.npy'),allow_pickle=True,encoding='latin1').item()
+        self.track_coefficients=np.array(constants_all[idx],dtype=float)
+
+        #bit-packed, memory-mapped land-sea mask (see LAND_MASK.py)
+        self.land_mask=LandMask(basin,path)
+
+        #pressure coefficients per month and 5x5 deg bin: [c0,c1,c2,c3,EPmu,EPstd,mpi]
+        JM_pressure=np.load(os.path.join(path,'COEFFICIENTS_JM_PRESSURE.npy'),allow_pickle=True).item()
+        self.JM_pressure={month:np.array(JM_pressure[idx][month]) for month in JM_pressure[idx]}
+
+        #genesis pressure per month: [Pmu,Pstd,DP0mu,DP0std,dpmin,dpmax]
+        Genpres=np.load(os.path.join(path,'DP0_PRES_GENESIS.npy'),allow_pickle=True).item()
+        self.genesis_pressure=Genpres[idx]
+
+        #wind-pressure relationship per month: [a,b]
+        WPR_coefficients=np.load(os.path.join(path,'COEFFICIENTS_WPR_PER_MONTH.npy'),allow_pickle=True).item()
+        self.WPR_coefficients={month:np.array(WPR_coefficients[idx][month]) for month in WPR_coefficients[idx]}
+
+        Genwind=np.load(os.path.join(path,'GENESIS_WIND.npy'),allow_pickle=True).item()
+        self.genesis_wind=Genwind[idx]
+
+        self.rmax_pressure=np.load(os.path.join(path,'RMAX_PRESSURE.npy'),allow_pickle=True).item()
+
+        self.penv_fields={}
+        self.genesis_grids={}
+        self.genesis_cumulative_weights={}
+        self.coast_distance=None
+
+    def MSLP(self,month):
+        """
+        Monthly mean MSLP field, with lat0=90 deg, lat1=-90 deg, lon0=0 deg, lon1=359.75 deg. len(lat)=721, len(lon)=1440.
+        The field is memory-mapped from its binary cache (see TEXT_CACHE.py), use Penv for the field over the basin.
+
+        Parameters
+        ----------
+        month : month.
+
+        Returns
+        -------
+        Penv_field : MSLP field (hPa).
+
+        """
+        return load_text(os.path.join(self.path,'Monthly_mean_MSLP_'+str(month)+'.txt'))
+
+    def Penv(self,month):
+        """
+        Monthly mean MSLP over the basin. The field is cut out of the 0.25 deg MSLP field (see MSLP)
+        once per month, and row r, column c correspond to row row0+r, column col0+c of the full field.
+
+        Parameters
+        ----------
+        month : month.
+
+        Returns
+        -------
+        Penv_field : MSLP field over the basin (hPa).
+        row0,col0 : row and column of the upper left corner in the full MSLP field.
+
+        """
+        if month not in self.penv_fields:
+            latidx_penv=np.linspace(90,-90,721)
+            lonidx_penv=np.linspace(0,359.75,1440)
+            row0,row1=np.abs(latidx_penv-self.lat1).argmin(),np.abs(latidx_penv-self.lat0).argmin()
+            col0,col1=np.abs(lonidx_penv-self.lon0).argmin(),np.abs(lonidx_penv-self.lon1).argmin()
+            Penv_field=self.MSLP(month)[row0:row1+1,col0:col1+1].copy()
+            self.penv_fields[month]=(Penv_field,row0,col0)
+        return self.penv_fields[month]
+
+    def genesis_grid(self,month):
+        """
+        1x1 deg matrix with genesis counts, rounded to 1 decimal
+
+        Parameters
+        ----------
+        month : month.
+
+        Returns
+        -------
+        grid : genesis matrix.
+
+        """
+        if month not in self.genesis_grids:
+            grid=load_text(os.path.join(self.path,'GRID_GENESIS_MATRIX_'+str(self.idx)+'_'+str(month)+'.txt'))
+            self.genesis_grids[month]=np.round(grid,1)
+        return self.genesis_grids[month]
+
+    def genesis_weights(self,month):
+        """
+        Cumulative genesis weights of the genesis matrix. A cell with value v (rounded to 1 decimal) gets weight int(10*v).
+        The weights are indexed as row*(len(col)-1)+col, as in the original weighted list of Startingpoint.
+
+        Parameters
+        ----------
+        month : month.
+
+        Returns
+        -------
+        cumulative_weights : cumulative sum of the weights per index.
+
+        """
+        if month not in self.genesis_cumulative_weights:
+            grid=self.genesis_grid(month)
+            ncol=len(grid[0,:])
+            value=np.where(grid>-1,10*np.where(grid>-1,grid,0),0).astype(int)
+            value[value<0]=0
+            rows,cols=np.indices(grid.shape)
+            weights=np.bincount((rows*(ncol-1)+cols).ravel(),weights=value.ravel())
+            self.genesis_cumulative_weights[month]=np.cumsum(weights)
+        return self.genesis_cumulative_weights[month]
+
+    def distance_to_coast(self):
+        """
+        Distance to coast raster on the 0.1 deg grid of the land-sea mask (see COAST_DISTANCE.py)
+
+        Returns
+        -------
+        raster : distance to coast in km.
+
+        """
+        if self.coast_distance is None:
+            self.coast_distance=distance_to_coast_raster(self.basin,self.path)
+        return self.coast_distance
+
+contexts={}
+
+def get_context(basin,path=__location__):
+    """
+    Return the simulation context of a basin. The context is created once per process and reused afterwards.
+
+    Parameters
+    ----------
+    basin : basin (EP,NA,NI,SI,SP,WP).
+    path : directory with the input files.
+
+    Returns
+    -------
+    context : SimulationContext.
+
+    """
+    if (basin,path) not in contexts:
+        contexts[(basin,path)]=SimulationContext(basin,path)
+    return contexts[(basin,path)]
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+This module is part of the IH-STORM model
+
+For more information, please see
+Bloemendaal, N., Haigh, I.D., de Moel, H. et al.
+Generation of a global synthetic tropical cyclone hazard dataset using STORM.
+Sci Data 7, 40 (2020). https://doi.org/10.1038/s41597-020-0381-2
+
+This is the STORM module for reading a catalogue of synthetic tracks (one or more STORM output files)
+without loading it in memory. Text files are parsed once, in chunks, into a binary cache that is
+memory-mapped (see TEXT_CACHE.py). HDF5 files are read lazily from their datasets. An index with the
+slice, year, TC number and rows of every TC is built on opening, so the TCs can be looked up by
+(slice, year, TC number) or iterated over with their columns, one chunk of rows at a time:
+
+    with Catalogue(['STORM_DATA_IBTRACS_WP_1000_YEARS_0.txt','STORM_DATA_IBTRACS_WP_1000_YEARS_1.txt']) as catalogue:
+        for nslice,year,storm,track in catalogue.storms(['lat','lon','wind']):
+            ...
+
+Released under the GNU General Public License v3.0
+"""
+import numpy as np
+import h5py
+import re
+import os
+import sys
+dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
+__location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
+
+#Custom made modules
+from STORM_OUTPUT import COLUMNS,CHUNK_ROWS
+from TEXT_CACHE import load_text
+
+NAMES=[name for name,dtype,unit in COLUMNS]
+
+def slice_number(fname,default):
+    """
+    Slice number of a STORM output file (..._YEARS_<slice>.txt), default if the name has no slice number
+    """
+    match=re.search(r'_YEARS_(\d+)',os.path.basename(fname))
+    return int(match.group(1)) if match else default
+
+class Catalogue:
+    """
+    Lazy reader of STORM output files (.txt or .h5)
+
+    Parameters
+    ----------
+    fnames : output file, or list of output files (e.g. the slices of a basin).
+    slices : slice number of every file. The default takes it from the file name (..._YEARS_<slice>.txt),
+        or the position in the list.
+    chunk_rows : number of rows that are read at once. The default is STORM_OUTPUT.CHUNK_ROWS.
+
+    The index of the TCs is stored in the arrays (one entry per TC, in the order of the files):
+    file, slice, year, storm (TC number in the year), start and end (TC k is stored in rows
+    start[k]:end[k] of file file[k]).
+
+    """
+    def __init__(self,fnames,slices=None,chunk_rows=CHUNK_ROWS):
+        if isinstance(fnames,str):
+            fnames=[fnames]
+        self.fnames=list(fnames)
+        self.chunk_rows=chunk_rows
+        if slices is None:
+            slices=[slice_number(fname,n) for n,fname in enumerate(self.fnames)]
+
+        self.tables=[]
+        for fname in self.fnames:
+            if fname.endswith('.h5'):
+                self.tables.append(h5py.File(fname,'r'))
+            elif os.path.getsize(fname)==0: #no TCs
+                self.tables.append(np.zeros((0,len(COLUMNS))))
+            else:
+                self.tables.append(load_text(fname,chunk_rows=chunk_rows,delimiter=',',ndmin=2))
+
+        #index: every TC starts at time step 0
+        index={'file':[],'slice':[],'year':[],'storm':[],'start':[]}
+        ends=[]
+        for n in range(0,len(self.fnames)):
+            nrows=self.nrows(n)
+            for a in range(0,nrows,chunk_rows):
+                data=self.read(n,a,min(a+chunk_rows,nrows),['year','storm','timestep'])
+                first=np.flatnonzero(data['timestep']==0)
+                index['file'].append(np.full(len(first),n))
+                index['slice'].append(np.full(len(first),slices[n]))
+                index['year'].append(data['year'][first])
+                index['storm'].append(data['storm'][first])
+                index['start'].append(a+first)
+            ends.append(nrows)
+        for key in index:
+            index[key]=np.concatenate(index[key]) if len(index[key])>0 else np.zeros(0)
+        self.file=index['file'].astype(np.int32)
+        self.slice=index['slice'].astype(np.int32)
+        self.year=index['year'].astype(np.int32)
+        self.storm=index['storm'].astype(np.int32)
+        self.start=index['start'].astype(np.int64)
+        #a TC ends where the next TC of the file starts, the last TC of a file at the end of the file
+        last=np.append(self.file[1:]!=self.file[:-1],True) if len(self.file)>0 else np.zeros(0,dtype=bool)
+        self.end=np.where(last,np.asarray(ends,dtype=np.int64)[self.file],np.append(self.start[1:],0))
+
+        #(slice, year, TC number) of every TC as one sorted key, to look up TCs
+        self.shape=(int(self.year.max())+1,int(self.storm.max())+1) if len(self)>0 else (1,1)
+        keys=(self.slice.astype(np.int64)*self.shape[0]+self.year)*self.shape[1]+self.storm
+        self.order=np.argsort(keys,kind='stable')
+        self.keys=keys[self.order]
+
+    def __len__(self):
+        return len(self.start)
+
+    def nrows(self,n):
+        """
+        Number of rows of file n
+        """
+        table=self.tables[n]
+        if isinstance(table,h5py.File):
+            return len(table['year'])
+        return len(table)
+
+    def read(self,n,a,b,columns=None):
+        """
+        Rows a:b of file n. For text files, the columns are float64 views of the memory-mapped cache;
+        for HDF5 files, they are read with the data types of STORM_OUTPUT.COLUMNS.
+
+        Parameters
+        ----------
+        n : file number.
+        a,b : first and last+1 row.
+        columns : list of column names (see STORM_OUTPUT.COLUMNS). The default is all columns.
+
+        Returns
+        -------
+        data : dictionary with an array per column.
+
+        """
+        if columns is None:
+            columns=NAMES
+        table=self.tables[n]
+        if isinstance(table,h5py.File):
+            return {name:table[name][a:b] for name in columns}
+        return {name:table[a:b,NAMES.index(name)] for name in columns}
+
+    def __getitem__(self,k):
+        """
+        Columns of TC number k of the catalogue
+        """
+        return self.read(self.file[k],self.start[k],self.end[k])
+
+    def find(self,nslice,year,storm):
+        """
+        Number of a TC in the catalogue
+
+        Parameters
+        ----------
+        nslice : slice number.
+        year : year.
+        storm : TC number in the year.
+
+        Returns
+        -------
+        k : TC number in the catalogue.
+
+        """
+        if 0<=year<self.shape[0] and 0<=storm<self.shape[1]:
+            key=(int(nslice)*self.shape[0]+int(year))*self.shape[1]+int(storm)
+            j=np.searchsorted(self.keys,key)
+            if j<len(self.keys) and self.keys[j]==key:
+                return int(self.order[j])
+        raise KeyError('No TC '+str(storm)+' in year '+str(year)+' of slice '+str(nslice))
+
+    def get(self,nslice,year,storm,columns=None):
+        """
+        Columns of a TC, by slice, year and TC number (see find and read)
+        """
+        k=self.find(nslice,year,storm)
+        return self.read(self.file[k],self.start[k],self.end[k],columns)
+
+    def select(self,slices=None,years=None):
+        """
+        Numbers of the TCs in a set of slices and a range of years
+
+        Parameters
+        ----------
+        slices : list of slice numbers. The default is all slices.
+        years : (first year, last+1 year). The default is all years.
+
+        Returns
+        -------
+        k : array of TC numbers in the catalogue.
+
+        """
+        keep=np.ones(len(self),dtype=bool)
+        if slices is not None:
+            keep=keep & np.isin(self.slice,slices)
+        if years is not None:
+            keep=keep & (self.year>=years[0]) & (self.year<years[1])
+        return np.flatnonzero(keep)
+
+    def storms(self,columns=None,select=None):
+        """
+        Iterate over the TCs of the catalogue. The rows are read in chunks of about chunk_rows rows, and the
+        columns of a TC are views of the chunk, so the memory use does not depend on the size of the catalogue.
+
+        Parameters
+        ----------
+        columns : list of column names (see STORM_OUTPUT.COLUMNS). The default is all columns.
+        select : TC numbers in the catalogue, in the order of the catalogue (see select). The default is all TCs.
+
+        Yields
+        ------
+        nslice,year,storm : slice, year and TC number in the year.
+        data : dictionary with an array per column.
+
+        """
+        if select is None:
+            select=np.arange(len(self))
+        j=0
+        while j<len(select):
+            #TCs of the same file that fit in one chunk (at least one TC)
+            k0=select[j]
+            jj=j+1
+            while jj<len(select) and self.file[select[jj]]==self.file[k0] and self.end[select[jj]]-self.start[k0]<=self.chunk_rows:
+                jj=jj+1
+            chunk=self.read(self.file[k0],self.start[k0],self.end[select[jj-1]],columns)
+            for k in select[j:jj]:
+                a,b=self.start[k]-self.start[k0],self.end[k]-self.start[k0]
+                yield int(self.slice[k]),int(self.year[k]),int(self.storm[k]),{name:chunk[name][a:b] for name in chunk}
+            j=jj
+
+    def close(self):
+        """
+        Close the HDF5 files and release the memory maps
+        """
+        for table in self.tables:
+            if isinstance(table,h5py.File):
+                table.close()
+        self.tables=[]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*args):
+        self.close()
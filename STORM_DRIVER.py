@@ -0,0 +1,412 @@
+# -*- coding: utf-8 -*-
+"""
+This module is part of the IH-STORM model
+
+For more information, please see
+Bloemendaal, N., Haigh, I.D., de Moel, H. et al.
+Generation of a global synthetic tropical cyclone hazard dataset using STORM.
+Sci Data 7, 40 (2020). https://doi.org/10.1038/s41597-020-0381-2
+
+This is the STORM driver that runs the simulation for a list of basins and slices. Every
+(basin, slice, year range) combination is a work unit that is handed to a process pool.
+Each unit writes its own output shard, and the shards of a slice are merged into the
+usual STORM_DATA_IBTRACS_<basin>_<years>_YEARS_<slice>.txt (or .h5) file afterwards.
+The years of a unit are simulated in blocks of BLOCK_YEARS years, and every (basin, slice, block)
+has its own random number stream, derived from the seed of the run, so the output of a seed does
+not depend on the number of processes or the years per unit.
+After every block the unit writes a checkpoint (the position in its output file and the next year),
+so an interrupted run can be resumed (run_storm with resume=True) and gives the same output as an
+uninterrupted run.
+
+Released under the GNU General Public License v3.0
+"""
+
+import numpy as np
+import math
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+#Custom made modules
+from SELECT_BASIN import Seasons
+from SAMPLE_STARTING_POINT import Startingpoint
+from SAMPLE_TC_MOVEMENT import TC_movement_batch
+from SAMPLE_TC_PRESSURE import TC_pressure_batch,MAX_RESTARTS,RESTART_POLICIES
+from SIMULATION_CONTEXT import get_context
+from STORM_OUTPUT import TrackWriter,merge_tracks,FORMATS
+from RANDOM_POOL import RandomPool
+import STORM_METRICS
+
+import os
+import sys
+dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
+__location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
+
+BLOCK_YEARS=100 #number of years that are simulated at once (the TCs of a block are moved and intensified in lockstep)
+
+def output_name(basin,total_years,nloop,output_format='txt'):
+    """
+    Name of the output file of one slice
+
+    Parameters
+    ----------
+    basin : basin.
+    total_years : number of years per slice.
+    nloop : slice number.
+    output_format : 'txt' or 'h5'. The default is 'txt'.
+
+    Returns
+    -------
+    fname : file name.
+
+    """
+    return 'STORM_DATA_IBTRACS_'+str(basin)+'_'+str(total_years)+'_YEARS_'+str(nloop)+'.'+output_format
+
+def shard_name(basin,total_years,nloop,year0,year1,output_format='txt'):
+    """
+    Name of the output shard of one work unit
+
+    Parameters
+    ----------
+    basin : basin.
+    total_years : number of years per slice.
+    nloop : slice number.
+    year0,year1 : first and last+1 year of the work unit.
+    output_format : 'txt' or 'h5'. The default is 'txt'.
+
+    Returns
+    -------
+    fname : file name.
+
+    """
+    return 'STORM_DATA_IBTRACS_'+str(basin)+'_'+str(total_years)+'_YEARS_'+str(nloop)+'_SHARD_'+str(year0)+'_'+str(year1)+'.'+output_format
+
+def checkpoint_name(fname):
+    """
+    Name of the checkpoint file of an output file (shard or slice)
+
+    Parameters
+    ----------
+    fname : output file.
+
+    Returns
+    -------
+    checkpoint : file name.
+
+    """
+    return os.path.splitext(fname)[0]+'_CHECKPOINT.json'
+
+def run_checkpoint_name(total_years):
+    """
+    Name of the checkpoint file of a run, with the seed, the years per unit and the finished slices
+
+    Parameters
+    ----------
+    total_years : number of years per slice.
+
+    Returns
+    -------
+    checkpoint : file name.
+
+    """
+    return 'STORM_CHECKPOINT_'+str(total_years)+'_YEARS.json'
+
+def write_checkpoint(fname,state):
+    """
+    Write a checkpoint file. The file is replaced in one step, so it is never left half written.
+
+    Parameters
+    ----------
+    fname : checkpoint file.
+    state : dictionary (json).
+
+    """
+    with open(fname+'.tmp','w') as f:
+        json.dump(state,f)
+    os.replace(fname+'.tmp',fname)
+
+def read_checkpoint(fname):
+    """
+    Read a checkpoint file
+
+    Parameters
+    ----------
+    fname : checkpoint file.
+
+    Returns
+    -------
+    state : dictionary, None if there is no checkpoint.
+
+    """
+    if not os.path.exists(fname):
+        return None
+    with open(fname,'r') as f:
+        return json.load(f)
+
+def work_units(basins,loop,total_years,years_per_unit):
+    """
+    Split the simulation in (basin, slice, year range) work units
+
+    Parameters
+    ----------
+    basins : list of basins (EP,NA,NI,SI,SP,WP).
+    loop : number of slices per basin.
+    total_years : number of years per slice.
+    years_per_unit : number of years simulated in one work unit.
+
+    Returns
+    -------
+    units : list of (basin,nloop,year0,year1).
+
+    """
+    units=[]
+    for basin in basins:
+        for nloop in range(0,loop):
+            for year0 in range(0,total_years,years_per_unit):
+                units.append((basin,nloop,year0,min(year0+years_per_unit,total_years)))
+    return units
+
+def block_rng(seed,basin,nloop,block):
+    """
+    Random number generator of one block of BLOCK_YEARS years of a slice. The stream is spawned
+    from the root SeedSequence of the run with spawn key (basin index, slice, block).
+
+    Parameters
+    ----------
+    seed : seed of the run.
+    basin : basin.
+    nloop : slice number.
+    block : block number (the block covers years block*BLOCK_YEARS to (block+1)*BLOCK_YEARS).
+
+    Returns
+    -------
+    rng : numpy.random.Generator.
+
+    """
+    basins=['EP','NA','NI','SI','SP','WP']
+    return np.random.default_rng(np.random.SeedSequence(seed,spawn_key=(basins.index(basin),nloop,block)))
+
+def season_rng(seed,basin,nloop):
+    """
+    Random number generator of the seasons (number of TCs and genesis months) of a slice,
+    spawned from the root SeedSequence of the run with spawn key (basin index, slice).
+
+    Parameters
+    ----------
+    seed : seed of the run.
+    basin : basin.
+    nloop : slice number.
+
+    Returns
+    -------
+    rng : numpy.random.Generator.
+
+    """
+    basins=['EP','NA','NI','SI','SP','WP']
+    return np.random.default_rng(np.random.SeedSequence(seed,spawn_key=(basins.index(basin),nloop)))
+
+def simulate_years(basin,nloop,year0,year1,fname,seed,total_years,resume=False,metrics=False,max_restarts=MAX_RESTARTS,restart_policy='discard',input_path=__location__):
+    """
+    Simulate the TCs for a range of years in one slice and write them to a file. A checkpoint
+    is written after every block of BLOCK_YEARS years.
+
+    Parameters
+    ----------
+    basin : basin.
+    nloop : slice number.
+    year0,year1 : first and last+1 year to simulate.
+    fname : output file (.txt or .h5).
+    seed : seed of the run.
+    total_years : number of years per slice.
+    resume : continue from the checkpoint of the output file, if there is one. The default is False.
+    metrics : collect counters and stage timers (see STORM_METRICS.py) and write them next to the output file. The default is False.
+    max_restarts,restart_policy : restart budget of a TC and what to do when it is used up (see TC_pressure_batch).
+    input_path : directory of the input files. The default is the directory of this module.
+
+    Returns
+    -------
+    fname : output file.
+
+    """
+    checkpoint=checkpoint_name(fname)
+    state=None
+    if resume and os.path.exists(fname):
+        state=read_checkpoint(checkpoint)
+    if state is None:
+        state={'year':year0,'position':None}
+    if state['year']>=year1:
+        print ('basin:',basin,nloop,'years:',year0,year1,'finished')
+        return fname
+
+    context=get_context(basin,input_path) #the input data is loaded once per process and basin
+
+    print ('basin:',basin,nloop,'years:',state['year'],year1)
+    #TC_data streams the rows [year,month,storm number,time step,basin id,lat,lon,pressure,wind,rmax,category,landfall flag,distance to land]
+    #to the output file in chunks, so the memory use does not grow with the number of years
+    STORM_METRICS.enabled=metrics
+    STORM_METRICS.reset() #the counters of a process start at 0 for every unit (including those of the pressure change sampler)
+    #the seasons of the whole slice are drawn once, and shared by the blocks
+    with STORM_METRICS.stage('genesis'):
+        seasons=Seasons(basin,total_years,season_rng(seed,basin,nloop),context)
+    with TrackWriter(fname,position=state['position']) as TC_data:
+        for block_start in range(state['year'],year1,BLOCK_YEARS):
+            block_end=min(block_start+BLOCK_YEARS,year1)
+            simulate_stream(basin,nloop,block_start,block_end,TC_data,context,seed,total_years,max_restarts,restart_policy,seasons)
+            #the random numbers of the next block do not depend on this block, so the output file and the next year are all that is needed to resume
+            position=TC_data.checkpoint()
+            unit_metrics=None
+            if metrics: #the metrics of the years before a resume are kept in the checkpoint
+                unit_metrics=STORM_METRICS.add_metrics(state.get('metrics'),STORM_METRICS.collect())
+                STORM_METRICS.write_metrics(STORM_METRICS.metrics_name(fname),unit_metrics,basin=basin,slice=nloop,years=[year0,block_end])
+            write_checkpoint(checkpoint,{'year':block_end,'position':position,'metrics':unit_metrics})
+    return fname
+
+def simulate_stream(basin,nloop,year0,year1,TC_data,context,seed,total_years,max_restarts=MAX_RESTARTS,restart_policy='discard',seasons=None):
+    """
+    Simulate the TCs for a range of years and feed them to TC_data
+
+    Parameters
+    ----------
+    basin : basin.
+    nloop : slice number.
+    year0,year1 : first and last+1 year to simulate. year0 should be a multiple of BLOCK_YEARS.
+    TC_data : list or TrackWriter to which the rows are appended.
+    context : SimulationContext of the basin.
+    seed : seed of the run.
+    total_years : number of years per slice.
+    max_restarts,restart_policy : restart budget of a TC and what to do when it is used up (see TC_pressure_batch).
+    seasons : (storms,months,offsets) of the whole slice, as returned by Seasons. The default draws them from the season stream of the slice.
+
+    """
+    #==============================================================================
+    #     Step 2: sample the number of TCs and genesis months. The seasons of the whole
+    #     slice are drawn at once, so they do not depend on how the slice is split in units
+    #==============================================================================
+    if seasons is None:
+        with STORM_METRICS.stage('genesis'):
+            seasons=Seasons(basin,total_years,season_rng(seed,basin,nloop),context)
+    storms,months,offsets=seasons
+    
+    for block_start in range(year0,year1,BLOCK_YEARS):
+        block_end=min(block_start+BLOCK_YEARS,year1)
+        rng=RandomPool(block_rng(seed,basin,nloop,block_start//BLOCK_YEARS)) #random numbers of the block are drawn in large arrays
+        genesis_month=months[offsets[block_start]:offsets[block_end]].tolist()
+        genesis_year=np.repeat(np.arange(block_start,block_end),storms[block_start:block_end]).tolist()
+
+        if len(genesis_month)>0:
+            #==============================================================================
+            # Step 3: Generate (list of) genesis locations
+            #==============================================================================
+            with STORM_METRICS.stage('genesis'):
+                lon_genesis_list,lat_genesis_list=Startingpoint(len(genesis_month),genesis_month,basin,context,rng)
+            #==============================================================================
+            # Step 4: Generate initial conditions
+            #==============================================================================
+            #the tracks of the block are kept as flat float32/int8 columns (see TRACKS.py)
+            with STORM_METRICS.stage('movement'):
+                tracks=TC_movement_batch(lon_genesis_list,lat_genesis_list,basin,ragged=True,context=context,rng=rng)
+            with STORM_METRICS.stage('pressure'):
+                TC_data=TC_pressure_batch(basin,tracks,None,None,genesis_year,genesis_month,TC_data,context,rng,max_restarts,restart_policy)
+
+def run_storm(basins,loop,total_years,processes=None,years_per_unit=None,path=__location__,output_format='txt',seed=None,resume=False,metrics=False,max_restarts=MAX_RESTARTS,restart_policy='discard',input_path=None):
+    """
+    Run STORM for a list of basins on a process pool
+
+    Parameters
+    ----------
+    basins : list of basins (EP,NA,NI,SI,SP,WP).
+    loop : number of slices per basin (ranges between 1 and 10 to simulate slices of 1000 years).
+    total_years : number of years per slice.
+    processes : number of worker processes. The default is the number of cores.
+    years_per_unit : number of years simulated in one work unit, rounded up to a multiple of BLOCK_YEARS.
+        The default splits the slices such that every worker process gets at least one unit.
+    path : directory of the output files and checkpoints.
+    output_format : 'txt' (comma separated text) or 'h5' (typed HDF5 columns, see STORM_OUTPUT.py). The default is 'txt'.
+    seed : seed of the run (integer). The default draws a new seed, which is printed so the run can be reproduced.
+    resume : continue an interrupted run from its checkpoints. The seed and years per unit are taken from the
+        checkpoint of the run, finished slices and blocks are skipped. The default is False.
+    metrics : write the counters and stage timers of every slice to STORM_DATA_..._METRICS.json, next to the output
+        (see STORM_METRICS.py). The default is False.
+    max_restarts : number of times a TC with an unrealistic pressure is regenerated from genesis (None for no limit).
+        The default is MAX_RESTARTS.
+    restart_policy : 'discard' (drop the TC) or 'clamp' (clamp its pressure to the lowest realistic pressure) when
+        a TC exceeds max_restarts. The default is 'discard'.
+    input_path : directory of the input files (coefficients, land-sea masks, genesis matrices, MSLP fields).
+        The default is path, so a run reads its inputs from and writes its output to the same data directory.
+
+    Returns
+    -------
+    outputs : list of output files (one per basin and slice).
+
+    """
+    if processes is None:
+        processes=os.cpu_count()
+    if input_path is None:
+        input_path=path
+    if output_format not in FORMATS:
+        raise ValueError('Unknown output format '+str(output_format)+', use one of '+str(FORMATS))
+    if restart_policy not in RESTART_POLICIES:
+        raise ValueError('Unknown restart policy '+str(restart_policy)+', use one of '+str(RESTART_POLICIES))
+
+    run_checkpoint=os.path.join(path,run_checkpoint_name(total_years))
+    state=read_checkpoint(run_checkpoint) if resume else None
+    if state is not None:
+        if seed is not None and seed!=state['seed']:
+            raise ValueError('The seed '+str(seed)+' differs from the seed of the interrupted run ('+str(state['seed'])+')')
+        seed=state['seed']
+        years_per_unit=state['years_per_unit'] #the checkpoints belong to the shards of the interrupted run
+        print('resuming run with seed:',seed)
+    else:
+        if seed is None:
+            seed=np.random.SeedSequence().entropy
+            print('seed:',seed)
+        state={'seed':seed,'finished':[]}
+
+    basins=list(dict.fromkeys(basins)) #every basin is simulated once
+
+    if years_per_unit is None:
+        nsplit=math.ceil(processes/float(len(basins)*loop))
+        years_per_unit=math.ceil(total_years/float(nsplit))
+    years_per_unit=BLOCK_YEARS*math.ceil(years_per_unit/float(BLOCK_YEARS)) #units consist of whole blocks
+    state['years_per_unit']=years_per_unit
+    write_checkpoint(run_checkpoint,state)
+
+    finished=[tuple(slice_id) for slice_id in state['finished']] #slices that are merged already
+    units=[unit for unit in work_units(basins,loop,total_years,years_per_unit) if unit[:2] not in finished]
+
+    files=[]
+    shards={}
+    for (basin,nloop,year0,year1) in units:
+        if year0==0 and year1==total_years: #one unit covers the whole slice, write it directly
+            fname=os.path.join(path,output_name(basin,total_years,nloop,output_format))
+        else:
+            fname=os.path.join(path,shard_name(basin,total_years,nloop,year0,year1,output_format))
+        files.append(fname)
+        shards.setdefault((basin,nloop),[]).append(fname)
+
+    if processes==1:
+        for unit,fname in zip(units,files):
+            simulate_years(*unit,fname,seed,total_years,resume,metrics,max_restarts,restart_policy,input_path)
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            jobs=[pool.submit(simulate_years,*unit,fname,seed,total_years,resume,metrics,max_restarts,restart_policy,input_path) for unit,fname in zip(units,files)]
+            for job in jobs:
+                job.result()
+
+    for (basin,nloop) in shards:
+        fname=os.path.join(path,output_name(basin,total_years,nloop,output_format))
+        if shards[(basin,nloop)]!=[fname]:
+            merge_tracks(shards[(basin,nloop)],fname)
+            if metrics:
+                slice_metrics=STORM_METRICS.add_metrics(*[read_checkpoint(checkpoint_name(shard))['metrics'] for shard in shards[(basin,nloop)]])
+                STORM_METRICS.write_metrics(STORM_METRICS.metrics_name(fname),slice_metrics,basin=basin,slice=nloop,years=[0,total_years])
+        state['finished'].append([basin,nloop])
+        write_checkpoint(run_checkpoint,state)
+        for shard in shards[(basin,nloop)]:
+            os.remove(checkpoint_name(shard))
+            if shard!=fname:
+                os.remove(shard)
+                if os.path.exists(STORM_METRICS.metrics_name(shard)):
+                    os.remove(STORM_METRICS.metrics_name(shard))
+
+    os.remove(run_checkpoint)
+    return [os.path.join(path,output_name(basin,total_years,nloop,output_format)) for basin in basins for nloop in range(0,loop)]
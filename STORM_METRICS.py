@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+This module is part of the IH-STORM model
+
+For more information, please see
+Bloemendaal, N., Haigh, I.D., de Moel, H. et al.
+Generation of a global synthetic tropical cyclone hazard dataset using STORM.
+Sci Data 7, 40 (2020). https://doi.org/10.1038/s41597-020-0381-2
+
+This is the STORM module for the run metrics. When enabled, the simulation counts what happens in
+the hot loops (storms, time steps, restarts, landfall decays) and times the stages of the simulation
+(genesis, movement, pressure, rmax, output). The time of a stage excludes the stages inside it, so
+the stage times add up to the simulation time. When disabled, count and stage do nothing.
+
+Released under the GNU General Public License v3.0
+"""
+import json
+import time
+import os
+import sys
+dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
+__location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
+
+enabled=False
+
+counters={} #name: count
+timers={}   #stage: seconds
+stages=[]   #running stages: [name,start time]
+
+def reset():
+    """
+    Set all counters and timers to 0
+    """
+    counters.clear()
+    timers.clear()
+    del stages[:]
+
+def count(name,n=1):
+    """
+    Add n to counter name
+    """
+    if enabled:
+        counters[name]=counters.get(name,0)+int(n)
+
+class stage:
+    """
+    Time a stage of the simulation: with stage('pressure'): ...
+
+    Parameters
+    ----------
+    name : name of the stage.
+
+    """
+    def __init__(self,name):
+        self.name=name
+
+    def __enter__(self):
+        if enabled:
+            now=time.perf_counter()
+            if len(stages)>0: #pause the enclosing stage
+                name,start=stages[-1]
+                timers[name]=timers.get(name,0.)+now-start
+            stages.append([self.name,now])
+
+    def __exit__(self,*args):
+        if enabled and len(stages)>0:
+            now=time.perf_counter()
+            name,start=stages.pop()
+            timers[name]=timers.get(name,0.)+now-start
+            if len(stages)>0: #resume the enclosing stage
+                stages[-1][1]=now
+
+def collect():
+    """
+    Current counters and timers
+
+    Returns
+    -------
+    metrics : dictionary with 'counters' and 'timers'.
+
+    """
+    return {'counters':dict(counters),'timers':dict(timers)}
+
+def add_metrics(*metrics):
+    """
+    Sum the counters and timers of several metrics (e.g. of the work units of a slice)
+
+    Parameters
+    ----------
+    metrics : dictionaries with 'counters' and 'timers', None is skipped.
+
+    Returns
+    -------
+    total : dictionary with 'counters' and 'timers'.
+
+    """
+    total={'counters':{},'timers':{}}
+    for m in metrics:
+        if m is None:
+            continue
+        for group in total:
+            for key in m[group]:
+                total[group][key]=total[group].get(key,0)+m[group][key]
+    return total
+
+def metrics_name(fname):
+    """
+    Name of the metrics file of an output file
+
+    Parameters
+    ----------
+    fname : output file.
+
+    Returns
+    -------
+    metrics : file name.
+
+    """
+    return os.path.splitext(fname)[0]+'_METRICS.json'
+
+def write_metrics(fname,metrics,**info):
+    """
+    Write metrics to a JSON file
+
+    Parameters
+    ----------
+    fname : metrics file.
+    metrics : dictionary with 'counters' and 'timers'.
+    info : other entries of the file (basin, slice, years, ...).
+
+    """
+    out=dict(info)
+    out.update(metrics)
+    c=metrics['counters']
+    if c.get('storms',0)>0:
+        out['steps_per_storm']=c.get('steps',0)/float(c['storms'])
+    out['total_seconds']=sum(metrics['timers'].values())
+    with open(fname,'w') as f:
+        json.dump(out,f,indent=1)
+
+def read_metrics(fname):
+    """
+    Read the counters and timers of a metrics file
+
+    Parameters
+    ----------
+    fname : metrics file.
+
+    Returns
+    -------
+    metrics : dictionary with 'counters' and 'timers'.
+
+    """
+    with open(fname,'r') as f:
+        out=json.load(f)
+    return {'counters':out['counters'],'timers':out['timers']}
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+This module is part of the IH-STORM model
+
+For more information, please see
+Bloemendaal, N., Haigh, I.D., de Moel, H. et al.
+Generation of a global synthetic tropical cyclone hazard dataset using STORM.
+Sci Data 7, 40 (2020). https://doi.org/10.1038/s41597-020-0381-2
+
+This is the STORM module for the output files. Besides the comma separated text files, the
+synthetic tracks can be stored in HDF5 (.h5), with one typed dataset per column (see COLUMNS).
+TrackWriter streams the rows to either format in chunks of fixed size, and load_tracks reads
+both formats and returns the columns as NumPy arrays.
+
+Released under the GNU General Public License v3.0
+"""
+import numpy as np
+import h5py
+import shutil
+import STORM_METRICS
+import os
+import sys
+dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
+__location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
+
+#==============================================================================
+# Columns of the STORM output: (name, data type, unit)
+#==============================================================================
+COLUMNS=[('year','int32','-'),                  #starts at 0
+         ('month','int8','-'),
+         ('storm','int32','-'),                 #TC number, for every year; starts at 0
+         ('timestep','int32','3-hourly'),       #for every TC; starts at 0
+         ('basin','int8','-'),                  #0=EP, 1=NA, 2=NI, 3=SI, 4=SP, 5=WP
+         ('lat','float32','deg'),               #position of the eye
+         ('lon','float32','deg'),               #position of the eye, ranges from 0-360 deg
+         ('pressure','float32','hPa'),          #minimum pressure
+         ('wind','float32','m/s'),              #maximum wind speed
+         ('rmax','float32','km'),               #radius to maximum winds
+         ('category','int8','-'),
+         ('landfall','int8','-'),               #0=no landfall, 1=landfall
+         ('distance','float32','km')]           #distance to land
+
+FORMATS=['txt','h5']
+
+CHUNK_ROWS=50000 #number of rows kept in memory by TrackWriter before they are written to disk
+
+def create_datasets(f,compression='gzip'):
+    """
+    Create the (empty, resizable) datasets of the STORM output in a HDF5 file
+
+    Parameters
+    ----------
+    f : h5py.File opened for writing.
+    compression : HDF5 compression filter. The default is 'gzip'.
+
+    """
+    for name,dtype,unit in COLUMNS:
+        dset=f.create_dataset(name,shape=(0,),dtype=dtype,maxshape=(None,),chunks=(CHUNK_ROWS,),
+                              compression=compression,shuffle=compression is not None)
+        dset.attrs['unit']=unit
+
+def append_columns(f,data):
+    """
+    Append rows to the datasets of the STORM output in a HDF5 file
+
+    Parameters
+    ----------
+    f : h5py.File with the datasets of create_datasets.
+    data : dictionary with an array per column (see COLUMNS).
+
+    """
+    for name,dtype,unit in COLUMNS:
+        n=len(f[name])
+        f[name].resize((n+len(data[name]),))
+        f[name][n:]=data[name]
+
+class TrackWriter:
+    """
+    Streaming writer of the STORM output. Rows are appended one at a time or in blocks (TrackWriter can be
+    passed to TC_pressure in place of the TC_data list) to a preallocated buffer, which is written to disk
+    once it holds chunk_rows rows, so the memory use does not depend on the number of simulated years.
+    The buffer grows if a block does not fit.
+
+    Parameters
+    ----------
+    fname : output file (.txt or .h5).
+    chunk_rows : number of rows kept in memory. The default is CHUNK_ROWS.
+    compression : HDF5 compression filter. The default is 'gzip'.
+    position : position returned by TrackWriter.checkpoint. The existing file is truncated to this position
+        and the new rows are appended. The default (None) creates a new file.
+
+    """
+    def __init__(self,fname,chunk_rows=CHUNK_ROWS,compression='gzip',position=None):
+        self.fname=fname
+        self.chunk_rows=chunk_rows
+        self.buffer=np.zeros((chunk_rows,len(COLUMNS)))
+        self.nbuffer=0 #number of rows in the buffer
+        self.nrows=0 #number of rows written to disk
+        
+        if fname.endswith('.h5'):
+            if position is None:
+                self.f=h5py.File(fname,'w')
+                create_datasets(self.f,compression)
+            else:
+                self.f=h5py.File(fname,'r+')
+                for name,dtype,unit in COLUMNS:
+                    self.f[name].resize((position['rows'],))
+        else:
+            if position is None:
+                self.f=open(fname,'wb')
+            else:
+                self.f=open(fname,'r+b')
+                self.f.truncate(position['offset'])
+                self.f.seek(position['offset'])
+        if position is not None:
+            self.nrows=position['rows']
+
+    def append(self,row):
+        """
+        Add a row [year,month,storm number,time step,basin id,lat,lon,pressure,wind,rmax,category,landfall flag,distance to land]
+        """
+        self.append_block(np.reshape(np.asarray(row,dtype=float),(1,len(COLUMNS))))
+
+    def append_block(self,block):
+        """
+        Add a block of rows (2D array with a column per entry of COLUMNS)
+        """
+        n=len(block)
+        if self.nbuffer+n>len(self.buffer):
+            buffer=np.zeros((max(2*len(self.buffer),self.nbuffer+n),len(COLUMNS)))
+            buffer[:self.nbuffer]=self.buffer[:self.nbuffer]
+            self.buffer=buffer
+        self.buffer[self.nbuffer:self.nbuffer+n]=block
+        self.nbuffer+=n
+        if self.nbuffer>=self.chunk_rows:
+            self.flush()
+
+    def extend(self,rows):
+        """
+        Add a list of rows
+        """
+        if len(rows)>0:
+            self.append_block(np.reshape(np.asarray(rows,dtype=float),(-1,len(COLUMNS))))
+
+    def __len__(self):
+        return self.nrows+self.nbuffer
+
+    def flush(self):
+        """
+        Write the rows in memory to disk
+        """
+        with STORM_METRICS.stage('output'):
+            if self.nbuffer>0:
+                data=self.buffer[:self.nbuffer]
+                if isinstance(self.f,h5py.File):
+                    append_columns(self.f,{name:data[:,i].astype(dtype) for i,(name,dtype,unit) in enumerate(COLUMNS)})
+                else:
+                    np.savetxt(self.f,data,fmt='%5s',delimiter=',')
+                self.nrows+=self.nbuffer
+                self.nbuffer=0
+            self.f.flush()
+
+    def checkpoint(self):
+        """
+        Write the rows in memory to disk and return the position in the file, from which the writer can be reopened
+
+        Returns
+        -------
+        position : dictionary with the number of rows and the size of the file (bytes, text files only).
+
+        """
+        self.flush()
+        if isinstance(self.f,h5py.File):
+            return {'rows':self.nrows}
+        os.fsync(self.f.fileno())
+        return {'rows':self.nrows,'offset':self.f.tell()}
+
+    def close(self):
+        """
+        Write the remaining rows and close the file
+        """
+        self.flush()
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*args):
+        self.close()
+
+def write_tracks(fname,TC_data,compression='gzip'):
+    """
+    Write the STORM output to a HDF5 file, with one dataset per column
+
+    Parameters
+    ----------
+    fname : output file (.h5).
+    TC_data : list (or array) of rows [year,month,storm number,time step,basin id,lat,lon,pressure,wind,rmax,category,landfall flag,distance to land].
+    compression : HDF5 compression filter. The default is 'gzip'.
+
+    """
+    with TrackWriter(fname,compression=compression) as writer:
+        writer.extend(TC_data)
+
+def load_tracks(fname,columns=None):
+    """
+    Load the STORM output (.txt or .h5)
+
+    Parameters
+    ----------
+    fname : STORM output file.
+    columns : list of column names to load. The default is all columns (see COLUMNS).
+
+    Returns
+    -------
+    data : dictionary with an array per column.
+
+    """
+    if columns is None:
+        columns=[name for name,dtype,unit in COLUMNS]
+
+    if fname.endswith('.h5'):
+        with h5py.File(fname,'r') as f:
+            return {name:f[name][:] for name in columns}
+
+    names=[name for name,dtype,unit in COLUMNS]
+    data=np.reshape(np.loadtxt(fname,delimiter=','),(-1,len(COLUMNS)))
+    return {name:data[:,names.index(name)].astype(COLUMNS[names.index(name)][1]) for name in columns}
+
+def load_track_table(fname):
+    """
+    Load the STORM output (.txt or .h5) as a 2D float array, as returned by np.loadtxt on the text output
+
+    Parameters
+    ----------
+    fname : STORM output file.
+
+    Returns
+    -------
+    data : array with one row per time step and one column per entry of COLUMNS.
+
+    """
+    if not fname.endswith('.h5'):
+        return np.loadtxt(fname,delimiter=',')
+    data=load_tracks(fname)
+    return np.column_stack([data[name].astype(float) for name,dtype,unit in COLUMNS])
+
+def merge_tracks(shards,fname):
+    """
+    Concatenate STORM output files (in the given order)
+
+    Parameters
+    ----------
+    shards : list of output files, all .txt or all .h5.
+    fname : merged output file.
+
+    """
+    if not fname.endswith('.h5'):
+        with open(fname,'wb') as fout:
+            for shard in shards:
+                with open(shard,'rb') as fin:
+                    shutil.copyfileobj(fin,fout)
+        return
+
+    with h5py.File(fname,'w') as fout:
+        create_datasets(fout)
+        for shard in shards:
+            with h5py.File(shard,'r') as fin:
+                for n in range(0,len(fin['year']),CHUNK_ROWS): #copy in chunks to keep the memory use flat
+                    append_columns(fout,{name:fin[name][n:n+CHUNK_ROWS] for name,dtype,unit in COLUMNS})
@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""
+This module is part of the IH-STORM model
+
+For more information, please see
+Bloemendaal, N., Haigh, I.D., de Moel, H. et al.
+Generation of a global synthetic tropical cyclone hazard dataset using STORM.
+Sci Data 7, 40 (2020). https://doi.org/10.1038/s41597-020-0381-2
+
+This is the STORM module for running a long catalogue on several machines. A manifest
+(STORM_MANIFEST_<years>_YEARS.json) splits the catalogue of every basin in shards of whole
+blocks of years. A shard has a basin, a global year range and a seed stream, and can be run on
+any node that sees the manifest:
+
+    python STORM_SHARDS.py run STORM_MANIFEST_100000_YEARS.json 3
+
+The shards are written next to the manifest. The merge step checks that every year of the
+catalogue is simulated by exactly one finished shard and concatenates the shards in year order:
+
+    python STORM_SHARDS.py merge STORM_MANIFEST_100000_YEARS.json
+
+The catalogue of a basin is one slice of the given number of years, and every shard draws the
+random numbers of its blocks from the same streams as STORM_DRIVER.run_storm, so the years in the
+output are global and the merged output equals that of a single run_storm with the same seed.
+run_local runs the shards as local processes (see MASTER_shards.py).
+
+Released under the GNU General Public License v3.0
+"""
+import numpy as np
+import json
+import subprocess
+import time
+import os
+import sys
+dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
+__location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
+
+#Custom made modules
+from STORM_DRIVER import simulate_years,output_name,shard_name,checkpoint_name,read_checkpoint,BLOCK_YEARS
+from STORM_OUTPUT import merge_tracks,FORMATS
+from SAMPLE_TC_PRESSURE import MAX_RESTARTS,RESTART_POLICIES
+import STORM_METRICS
+
+BASINS=['EP','NA','NI','SI','SP','WP']
+
+def manifest_name(total_years):
+    """
+    Name of the manifest of a catalogue
+
+    Parameters
+    ----------
+    total_years : number of years of the catalogue.
+
+    Returns
+    -------
+    manifest : file name.
+
+    """
+    return 'STORM_MANIFEST_'+str(total_years)+'_YEARS.json'
+
+def make_manifest(basins,total_years,years_per_shard,seed=None,output_format='txt',max_restarts=MAX_RESTARTS,restart_policy='discard'):
+    """
+    Split the catalogue of every basin in shards
+
+    Parameters
+    ----------
+    basins : list of basins (EP,NA,NI,SI,SP,WP).
+    total_years : number of years of the catalogue of a basin.
+    years_per_shard : number of years of a shard, rounded up to a multiple of BLOCK_YEARS.
+    seed : seed of the catalogue (integer). The default draws a new seed.
+    output_format : 'txt' or 'h5'. The default is 'txt'.
+    max_restarts,restart_policy : restart budget of a TC and what to do when it is used up (see TC_pressure_batch).
+
+    Returns
+    -------
+    manifest : dictionary (json) with the settings of the run and the list of shards. Shard k has
+        'id', 'basin', 'year0' (the global year offset), 'year1', the output file and its seed stream:
+        block b of the shard (years b*BLOCK_YEARS to (b+1)*BLOCK_YEARS) draws from
+        np.random.SeedSequence(seed,spawn_key=spawn_key+[b]), see STORM_DRIVER.block_rng.
+
+    """
+    if output_format not in FORMATS:
+        raise ValueError('Unknown output format '+str(output_format)+', use one of '+str(FORMATS))
+    if restart_policy not in RESTART_POLICIES:
+        raise ValueError('Unknown restart policy '+str(restart_policy)+', use one of '+str(RESTART_POLICIES))
+    if seed is None:
+        seed=np.random.SeedSequence().entropy
+        print('seed:',seed)
+
+    years_per_shard=BLOCK_YEARS*int(np.ceil(years_per_shard/float(BLOCK_YEARS))) #shards consist of whole blocks
+    shards=[]
+    for basin in list(dict.fromkeys(basins)):
+        for year0 in range(0,total_years,years_per_shard):
+            year1=min(year0+years_per_shard,total_years)
+            shards.append({'id':len(shards),'basin':basin,'year0':year0,'year1':year1,
+                           'output':shard_name(basin,total_years,0,year0,year1,output_format),
+                           'seed_stream':{'seed':seed,'spawn_key':[BASINS.index(basin),0],
+                                          'blocks':[year0//BLOCK_YEARS,(year1+BLOCK_YEARS-1)//BLOCK_YEARS]}})
+
+    return {'total_years':total_years,'block_years':BLOCK_YEARS,'seed':seed,'output_format':output_format,
+            'max_restarts':max_restarts,'restart_policy':restart_policy,'shards':shards}
+
+def check_manifest(manifest):
+    """
+    Check that the shards of every basin cover the years of the catalogue exactly once
+
+    Parameters
+    ----------
+    manifest : dictionary (see make_manifest).
+
+    """
+    if manifest['block_years']!=BLOCK_YEARS:
+        raise ValueError('The manifest uses blocks of '+str(manifest['block_years'])+' years, STORM_DRIVER uses '+str(BLOCK_YEARS))
+    ids=[shard['id'] for shard in manifest['shards']]
+    if len(set(ids))!=len(ids):
+        raise ValueError('The manifest has duplicate shard ids')
+
+    total_years=manifest['total_years']
+    for basin in basins_of(manifest):
+        covered=np.zeros(total_years,dtype=int)
+        for shard in manifest['shards']:
+            if shard['basin']!=basin:
+                continue
+            if not (0<=shard['year0']<shard['year1']<=total_years) or shard['year0']%BLOCK_YEARS!=0:
+                raise ValueError('Shard '+str(shard['id'])+' has an invalid year range '+str([shard['year0'],shard['year1']]))
+            covered[shard['year0']:shard['year1']]+=1
+        for years,name in [(np.flatnonzero(covered==0),'missing'),(np.flatnonzero(covered>1),'duplicated')]:
+            if len(years)>0:
+                raise ValueError('Basin '+str(basin)+': '+str(len(years))+' years are '+name+' in the manifest, starting at year '+str(years[0]))
+
+def basins_of(manifest):
+    """
+    Basins of a manifest, in the order of the shards
+    """
+    return list(dict.fromkeys([shard['basin'] for shard in manifest['shards']]))
+
+def write_manifest(fname,manifest):
+    """
+    Check and write a manifest
+
+    Parameters
+    ----------
+    fname : manifest file.
+    manifest : dictionary (see make_manifest).
+
+    """
+    check_manifest(manifest)
+    tmp=fname+'.'+str(os.getpid())+'.tmp'
+    with open(tmp,'w') as f:
+        json.dump(manifest,f,indent=1)
+    os.replace(tmp,fname)
+
+def read_manifest(fname):
+    """
+    Read and check a manifest
+
+    Parameters
+    ----------
+    fname : manifest file.
+
+    Returns
+    -------
+    manifest : dictionary (see make_manifest).
+
+    """
+    with open(fname,'r') as f:
+        manifest=json.load(f)
+    check_manifest(manifest)
+    return manifest
+
+def get_shard(manifest,shard_id):
+    """
+    Shard of a manifest by id
+    """
+    for shard in manifest['shards']:
+        if shard['id']==int(shard_id):
+            return shard
+    raise ValueError('The manifest has no shard '+str(shard_id))
+
+def run_shard(fname,shard_id,resume=False,metrics=False):
+    """
+    Simulate one shard of a manifest. The output and checkpoint of the shard are written next to the manifest.
+
+    Parameters
+    ----------
+    fname : manifest file.
+    shard_id : id of the shard.
+    resume : continue the shard from its checkpoint. The default is False.
+    metrics : write the counters and stage timers of the shard (see STORM_METRICS.py). The default is False.
+
+    Returns
+    -------
+    output : output file of the shard.
+
+    """
+    manifest=read_manifest(fname)
+    shard=get_shard(manifest,shard_id)
+    stream=shard['seed_stream']
+    if stream['spawn_key']!=[BASINS.index(shard['basin']),0]:
+        raise ValueError('Shard '+str(shard_id)+' has seed stream '+str(stream['spawn_key'])+', which is not the stream of basin '+str(shard['basin']))
+
+    path=os.path.dirname(os.path.abspath(fname))
+    print('shard:',shard['id'],'basin:',shard['basin'],'years:',shard['year0'],shard['year1'])
+    return simulate_years(shard['basin'],0,shard['year0'],shard['year1'],os.path.join(path,shard['output']),stream['seed'],manifest['total_years'],
+                          resume,metrics,manifest['max_restarts'],manifest['restart_policy'])
+
+def shard_years(fname):
+    """
+    Year column of an output file
+
+    Parameters
+    ----------
+    fname : output file (.txt or .h5).
+
+    Returns
+    -------
+    years : array with the year of every row.
+
+    """
+    if fname.endswith('.h5'):
+        import h5py
+        with h5py.File(fname,'r') as f:
+            return f['year'][:]
+    if os.path.getsize(fname)==0: #no TCs in the shard
+        return np.zeros(0,dtype=int)
+    return np.loadtxt(fname,delimiter=',',usecols=0,ndmin=1).astype(int)
+
+def merge_shards(fname,remove=False):
+    """
+    Merge the shards of a manifest into one output file per basin. Every shard must be finished
+    (according to its checkpoint), the shards must cover every year of the catalogue exactly once, and
+    the years in a shard must be sorted and lie in the year range of the shard.
+
+    Parameters
+    ----------
+    fname : manifest file.
+    remove : remove the shards, their checkpoints and metrics after merging. The default is False.
+
+    Returns
+    -------
+    outputs : list of output files (one per basin).
+
+    """
+    manifest=read_manifest(fname)
+    path=os.path.dirname(os.path.abspath(fname))
+    total_years=manifest['total_years']
+
+    outputs=[]
+    for basin in basins_of(manifest):
+        shards=sorted([shard for shard in manifest['shards'] if shard['basin']==basin],key=lambda shard: shard['year0'])
+        files=[os.path.join(path,shard['output']) for shard in shards]
+        for shard,shard_file in zip(shards,files):
+            state=read_checkpoint(checkpoint_name(shard_file))
+            if not os.path.exists(shard_file) or state is None or state['year']<shard['year1']:
+                raise ValueError('Shard '+str(shard['id'])+' ('+str(basin)+', years '+str(shard['year0'])+'-'+str(shard['year1'])+') is not finished')
+            years=shard_years(shard_file)
+            if len(years)>0 and (np.any(np.diff(years)<0) or years[0]<shard['year0'] or years[-1]>=shard['year1']):
+                raise ValueError('Shard '+str(shard['id'])+' has years outside '+str(shard['year0'])+'-'+str(shard['year1'])+' or out of order')
+
+        output=os.path.join(path,output_name(basin,total_years,0,manifest['output_format']))
+        print('merging',len(files),'shards into',output)
+        merge_tracks(files,output)
+        if all([os.path.exists(STORM_METRICS.metrics_name(shard_file)) for shard_file in files]):
+            basin_metrics=STORM_METRICS.add_metrics(*[STORM_METRICS.read_metrics(STORM_METRICS.metrics_name(shard_file)) for shard_file in files])
+            STORM_METRICS.write_metrics(STORM_METRICS.metrics_name(output),basin_metrics,basin=basin,slice=0,years=[0,total_years])
+        if remove:
+            for shard_file in files:
+                for name in [shard_file,checkpoint_name(shard_file),STORM_METRICS.metrics_name(shard_file)]:
+                    if os.path.exists(name):
+                        os.remove(name)
+        outputs.append(output)
+    return outputs
+
+def run_local(fname,processes=None,resume=False,metrics=False):
+    """
+    Run all shards of a manifest as local processes, the stand-in for the nodes of a cluster.
+    Every process runs 'python STORM_SHARDS.py run <manifest> <shard>'.
+
+    Parameters
+    ----------
+    fname : manifest file.
+    processes : number of shards that run at the same time. The default is the number of cores.
+    resume : continue the shards from their checkpoints. The default is False.
+    metrics : write the counters and stage timers of every shard. The default is False.
+
+    Returns
+    -------
+    failed : list of ids of the shards that failed.
+
+    """
+    if processes is None:
+        processes=os.cpu_count()
+    manifest=read_manifest(fname)
+    options=(['--resume'] if resume else [])+(['--metrics'] if metrics else [])
+
+    queue=[shard['id'] for shard in manifest['shards']]
+    running={}
+    failed=[]
+    while len(queue)>0 or len(running)>0:
+        while len(queue)>0 and len(running)<processes:
+            shard_id=queue.pop(0)
+            running[shard_id]=subprocess.Popen([sys.executable,os.path.join(__location__,'STORM_SHARDS.py'),'run',os.path.abspath(fname),str(shard_id)]+options)
+        for shard_id in list(running):
+            returncode=running[shard_id].poll()
+            if returncode is not None:
+                del running[shard_id]
+                if returncode!=0:
+                    print('shard',shard_id,'failed with exit code',returncode)
+                    failed.append(shard_id)
+        time.sleep(0.1)
+    return failed
+
+if __name__=='__main__':
+    #python STORM_SHARDS.py run <manifest> <shard> [--resume] [--metrics]
+    #python STORM_SHARDS.py merge <manifest> [--remove]
+    args=[arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if len(args)==3 and args[0]=='run':
+        run_shard(args[1],args[2],resume='--resume' in sys.argv,metrics='--metrics' in sys.argv)
+    elif len(args)==2 and args[0]=='merge':
+        merge_shards(args[1],remove='--remove' in sys.argv)
+    else:
+        print('usage: python STORM_SHARDS.py run <manifest> <shard> [--resume] [--metrics]')
+        print('       python STORM_SHARDS.py merge <manifest> [--remove]')
+        sys.exit(1)
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+This module is part of the IH-STORM model
+
+For more information, please see
+Bloemendaal, N., Haigh, I.D., de Moel, H. et al.
+Generation of a global synthetic tropical cyclone hazard dataset using STORM.
+Sci Data 7, 40 (2020). https://doi.org/10.1038/s41597-020-0381-2
+
+This is the STORM module for synthetic input data. It writes small stand-ins for the preprocessed
+IBTrACS/ERA5 input files (coefficients, land-sea masks, genesis grids, MSLP fields), with the same
+names and layout, so the simulation can be run and timed without the full dataset (see MASTER_benchmark.py).
+The values are plausible but not physical, do not use them for hazard assessments.
+
+Released under the GNU General Public License v3.0
+"""
+import numpy as np
+import os
+import sys
+dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
+__location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
+
+from SELECT_BASIN import Basin_boundaries
+
+basins=['EP','NA','NI','SI','SP','WP']
+
+#genesis months per basin
+MONTHS={'EP':[6,7,8,9,10,11],'NA':[6,7,8,9,10,11],'NI':[10,11],'SI':[1,2,3,4,11,12],'SP':[1,2,3,4,11,12],'WP':[5,6,7,8,9,10,11]}
+
+def synthetic_files(path):
+    """
+    Check if the synthetic input data is present
+
+    Parameters
+    ----------
+    path : directory of the input files.
+
+    Returns
+    -------
+    present : True if the input files of all basins are in path.
+
+    """
+    months=sorted(set(sum(MONTHS.values(),[])))
+    files=['POISSON_GENESIS_PARAMETERS.txt','GENESIS_MONTHS.npy','TRACK_COEFFICIENTS.npy','COEFFICIENTS_JM_PRESSURE.npy',
+           'DP0_PRES_GENESIS.npy','COEFFICIENTS_WPR_PER_MONTH.npy','GENESIS_WIND.npy','RMAX_PRESSURE.npy','coastal_basemap_data.npy']
+    files+=['Land_ocean_mask_'+basin+'.txt' for basin in basins]
+    files+=['GRID_GENESIS_MATRIX_'+str(idx)+'_'+str(month)+'.txt' for idx,basin in enumerate(basins) for month in MONTHS[basin]]
+    files+=['Monthly_mean_MSLP_'+str(month)+'.txt' for month in months]
+    return all(os.path.exists(os.path.join(path,fname)) for fname in files)
+
+def make_synthetic_input(path,seed=0):
+    """
+    Write synthetic input files for all basins
+
+    Parameters
+    ----------
+    path : directory of the input files (created if needed).
+    seed : seed of the random values. The default is 0.
+
+    """
+    os.makedirs(path,exist_ok=True)
+    rng=np.random.default_rng(seed)
+
+    np.savetxt(os.path.join(path,'POISSON_GENESIS_PARAMETERS.txt'),[16.,12.,4.,14.,8.,25.])
+    np.save(os.path.join(path,'GENESIS_MONTHS.npy'),{idx:list(rng.choice(MONTHS[basin],50)) for idx,basin in enumerate(basins)})
+
+    #track coefficients per 5 deg latitude bin: [a0,a1,b0,b1,b2,Elatmu,Elatstd,Elonmu,Elonstd,Dlat0mu,Dlat0std,Dlon0mu,Dlon0std]
+    #the TCs move westward and poleward
+    track={}
+    for idx,basin in enumerate(basins):
+        s=-1. if basin in ['SI','SP'] else 1.
+        track[idx]=[[-0.3,0.9,0.02*s,0.9,0.2*s,0.,0.3,0.,0.3,0.2*s,0.3,-0.3,0.4] for b in range(11)]
+    np.save(os.path.join(path,'TRACK_COEFFICIENTS.npy'),track)
+
+    JM_pressure={}
+    Genpres={}
+    WPR_coefficients={}
+    Genwind={}
+    for idx,basin in enumerate(basins):
+        lat0,lat1,lon0,lon1=Basin_boundaries(basin)
+        nbins=int((lat1-lat0)/5+1)*int((lon1-lon0)/5+1)
+        JM_pressure[idx]={}
+        Genpres[idx]={}
+        WPR_coefficients[idx]={}
+        Genwind[idx]={}
+        for month in MONTHS[basin]:
+            JM_pressure[idx][month]=[[-0.5,0.6,1.5,0.02,0.,2.5,880.] for b in range(nbins)]   #[c0,c1,c2,c3,EPmu,EPstd,mpi]
+            Genpres[idx][month]=[1000.,5.,-1.,2.,-20.,15.]                                     #[Pmu,Pstd,DP0mu,DP0std,dpmin,dpmax]
+            WPR_coefficients[idx][month]=[2.5,0.7]                                             #[a,b]
+            Genwind[idx][month]=list(rng.uniform(18.,25.,40))
+    np.save(os.path.join(path,'COEFFICIENTS_JM_PRESSURE.npy'),JM_pressure)
+    np.save(os.path.join(path,'DP0_PRES_GENESIS.npy'),Genpres)
+    np.save(os.path.join(path,'COEFFICIENTS_WPR_PER_MONTH.npy'),WPR_coefficients)
+    np.save(os.path.join(path,'GENESIS_WIND.npy'),Genwind)
+    np.save(os.path.join(path,'RMAX_PRESSURE.npy'),{0:list(rng.uniform(10.,30.,100)),1:list(rng.uniform(20.,50.,100)),2:list(rng.uniform(30.,80.,100))})
+
+    #land in the east and towards the pole of every basin (row 0 of the mask is at lat1), no genesis in the east
+    for idx,basin in enumerate(basins):
+        lat0,lat1,lon0,lon1=Basin_boundaries(basin)
+        ny,nx=10*(lat1-lat0),10*(lon1-lon0)
+        y,x=np.indices((ny,nx))
+        land=(x>0.8*nx) | (y<0.3*ny) if lat0>0 else (x>0.8*nx) | (y>0.7*ny)
+        np.savetxt(os.path.join(path,'Land_ocean_mask_'+basin+'.txt'),land.astype(int),fmt='%d')
+        for month in MONTHS[basin]:
+            grid=rng.uniform(0.,2.,(lat1-lat0,lon1-lon0))
+            grid[:,int(0.8*(lon1-lon0)):]=np.nan
+            np.savetxt(os.path.join(path,'GRID_GENESIS_MATRIX_'+str(idx)+'_'+str(month)+'.txt'),grid)
+
+    lats=np.linspace(-60.,60.,241)
+    coast={'lons':np.concatenate([np.full(241,-20.),np.full(241,90.),np.full(241,170.)]),'lats':np.tile(lats,3)}
+    np.save(os.path.join(path,'coastal_basemap_data.npy'),coast)
+
+    #MSLP on the 0.25 deg global grid, lowest in the tropics
+    lat=np.linspace(90,-90,721)
+    for month in sorted(set(sum(MONTHS.values(),[]))):
+        mslp=1012.-4.*np.cos(np.radians(lat))[:,None]+rng.normal(0.,1.,(721,1440))
+        np.savetxt(os.path.join(path,'Monthly_mean_MSLP_'+str(month)+'.txt'),mslp,fmt='%.2f')
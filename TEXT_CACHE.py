@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+This module is part of the IH-STORM model
+
+For more information, please see
+Bloemendaal, N., Haigh, I.D., de Moel, H. et al.
+Generation of a global synthetic tropical cyclone hazard dataset using STORM.
+Sci Data 7, 40 (2020). https://doi.org/10.1038/s41597-020-0381-2
+
+This is the STORM module for reading the text input files (MSLP, SST and MPI fields, genesis matrices,
+land-sea masks, ...). A text file is parsed with np.loadtxt once and stored as <name>_CACHE.npy next to it,
+with the modification time, size and SHA-1 hash of the text file in <name>_CACHE.json. Later reads
+memory-map the .npy file. If the modification time or size of the text file changed, the hash is
+compared and the text file is parsed again if its content changed. Large tables (e.g. the STORM output)
+can be parsed in chunks of rows, so the memory use does not grow with the size of the file.
+
+Released under the GNU General Public License v3.0
+"""
+import numpy as np
+import hashlib
+import itertools
+import json
+import os
+import sys
+dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
+__location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
+
+def cache_names(fname):
+    """
+    Names of the cache files of a text file
+
+    Parameters
+    ----------
+    fname : text file.
+
+    Returns
+    -------
+    fcache : binary cache (.npy).
+    finfo : modification time, size and hash of the text file (.json).
+
+    """
+    base=os.path.splitext(fname)[0]
+    return base+'_CACHE.npy',base+'_CACHE.json'
+
+def file_hash(fname):
+    """
+    SHA-1 hash of the content of a file
+    """
+    sha1=hashlib.sha1()
+    with open(fname,'rb') as f:
+        for chunk in iter(lambda: f.read(1<<20),b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+def read_info(finfo):
+    """
+    Read the cache information, None if it is missing or unreadable
+    """
+    try:
+        with open(finfo,'r') as f:
+            return json.load(f)
+    except (OSError,ValueError):
+        return None
+
+def write_info(finfo,info):
+    """
+    Write the cache information. The file is written to a temporary file first and then renamed.
+    """
+    tmp=finfo+'.'+str(os.getpid())+'.tmp'
+    with open(tmp,'w') as f:
+        json.dump(info,f,indent=1)
+    os.replace(tmp,finfo)
+
+def parse_chunks(fname,fout,chunk_rows,**kwargs):
+    """
+    Parse a text table with np.loadtxt in chunks of rows and write it to a .npy file
+
+    Parameters
+    ----------
+    fname : text file.
+    fout : .npy file.
+    chunk_rows : number of rows parsed at once.
+    **kwargs : keyword arguments of np.loadtxt. Use ndmin=2, so every chunk is a table.
+
+    """
+    comments=kwargs.get('comments','#')
+    with open(fname,'r') as f: #number of rows, to allocate the .npy file
+        nrows=sum(1 for line in f if len(line.strip())>0 and not line.lstrip().startswith(comments))
+
+    out=None
+    n=0
+    with open(fname,'r') as f:
+        while True:
+            lines=list(itertools.islice(f,chunk_rows))
+            if len(lines)==0:
+                break
+            chunk=np.loadtxt(lines,**kwargs)
+            if out is None:
+                out=np.lib.format.open_memmap(fout,mode='w+',dtype=chunk.dtype,shape=(nrows,)+chunk.shape[1:])
+            out[n:n+len(chunk)]=chunk
+            n=n+len(chunk)
+
+    if out is None or n!=nrows: #empty file, or rows that were not counted right (e.g. other comment characters)
+        del out
+        with open(fout,'wb') as f:
+            np.save(f,np.loadtxt(fname,**kwargs))
+        return
+    out.flush()
+    del out
+
+def load_text(fname,mmap_mode='r',chunk_rows=None,**kwargs):
+    """
+    Load a text file as np.loadtxt does, through the binary cache
+
+    Parameters
+    ----------
+    fname : text file.
+    mmap_mode : mmap_mode of np.load. The default is 'r' (read-only memory map), None loads the array in memory.
+    chunk_rows : parse the text file in chunks of chunk_rows rows (see parse_chunks). The default (None) parses it at once.
+    **kwargs : keyword arguments of np.loadtxt (delimiter, ndmin, ...). They are part of the cache information,
+               the text file is parsed again if they change.
+
+    Returns
+    -------
+    data : array.
+
+    """
+    fcache,finfo=cache_names(fname)
+    stat=os.stat(fname)
+    options=json.loads(json.dumps(kwargs,sort_keys=True,default=str))
+
+    sha1=None
+    info=read_info(finfo)
+    if info is not None and info.get('options')==options and os.path.exists(fcache):
+        if info['mtime_ns']==stat.st_mtime_ns and info['size']==stat.st_size:
+            return np.load(fcache,mmap_mode=mmap_mode)
+        #the text file was touched or copied: only parse it again if the content changed
+        sha1=file_hash(fname)
+        if info['sha1']==sha1:
+            info['mtime_ns'],info['size']=stat.st_mtime_ns,stat.st_size
+            try:
+                write_info(finfo,info)
+            except OSError:
+                pass
+            return np.load(fcache,mmap_mode=mmap_mode)
+
+    if chunk_rows is None:
+        data=np.loadtxt(fname,**kwargs)
+    if sha1 is None:
+        sha1=file_hash(fname)
+
+    try:
+        #write to a temporary file first, so other processes never map a half-written cache
+        tmp=fcache+'.'+str(os.getpid())+'.tmp'
+        if chunk_rows is None:
+            with open(tmp,'wb') as f:
+                np.save(f,data)
+        else:
+            parse_chunks(fname,tmp,chunk_rows,**kwargs)
+        os.replace(tmp,fcache)
+        write_info(finfo,{'source':os.path.basename(fname),'mtime_ns':stat.st_mtime_ns,'size':stat.st_size,'sha1':sha1,'options':options})
+    except OSError as e: #e.g. a read-only input directory
+        print('could not cache',fname,':',e)
+        return data if chunk_rows is None else np.loadtxt(fname,**kwargs)
+
+    return np.load(fcache,mmap_mode=mmap_mode)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+This module is part of the IH-STORM model
+
+For more information, please see
+Bloemendaal, N., Haigh, I.D., de Moel, H. et al.
+Generation of a global synthetic tropical cyclone hazard dataset using STORM.
+Sci Data 7, 40 (2020). https://doi.org/10.1038/s41597-020-0381-2
+
+This is the STORM module for the track container. The tracks of a batch of TCs are stored as flat
+columns (latitude and longitude as float32, landfall as int8) and an int64 offsets array: TC k is
+stored in [offsets[k]:offsets[k+1]]. The track positions lie on the 0.1 deg grid of the land-sea mask,
+so the float32 columns hold them exactly enough to get the same 0.1 deg values back (see coordinates).
+
+Released under the GNU General Public License v3.0
+"""
+import numpy as np
+import os
+import sys
+dir_path=os.path.dirname(os.path.realpath(sys.argv[0]))
+__location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
+
+class Tracks:
+    """
+    Tracks of a batch of TCs as flat columns and offsets
+
+    Parameters
+    ----------
+    lat : flat array of latitude positions of all TCs.
+    lon : flat array of longitude positions.
+    landfall : flat array of landfall (0=no 1=yes).
+    offsets : TC number k is stored in [offsets[k]:offsets[k+1]].
+
+    """
+    __slots__=('lat','lon','landfall','offsets')
+
+    def __init__(self,lat,lon,landfall,offsets):
+        self.lat=np.asarray(lat,dtype=np.float32)
+        self.lon=np.asarray(lon,dtype=np.float32)
+        self.landfall=np.asarray(landfall,dtype=np.int8)
+        self.offsets=np.asarray(offsets,dtype=np.int64)
+
+    def __len__(self):
+        return len(self.offsets)-1
+
+    def __getitem__(self,k):
+        """
+        Track of TC k: views (no copies) of the latitude, longitude and landfall columns
+        """
+        a,b=self.offsets[k],self.offsets[k+1]
+        return self.lat[a:b],self.lon[a:b],self.landfall[a:b]
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+    def lengths(self):
+        """
+        Number of track points of every TC
+        """
+        return np.diff(self.offsets)
+
+    def coordinates(self):
+        """
+        Latitude and longitude of all track points as float64, on the 0.1 deg grid
+
+        Returns
+        -------
+        lat,lon : flat arrays of latitude and longitude positions.
+
+        """
+        return np.round(self.lat.astype(float),1),np.round(self.lon.astype(float),1)
+
+    def tolists(self):
+        """
+        Lists with the positions and landfall of every TC (as returned by TC_movement)
+        """
+        lat,lon=self.coordinates()
+        landfall=self.landfall.astype(float)
+        split=lambda flat: [flat[self.offsets[k]:self.offsets[k+1]].tolist() for k in range(len(self))]
+        return split(lat),split(lon),split(landfall)
+
+    def nbytes(self):
+        """
+        Memory use of the columns and offsets (bytes)
+        """
+        return self.lat.nbytes+self.lon.nbytes+self.landfall.nbytes+self.offsets.nbytes
+
+def tracks_from_lists(latlist,lonlist,landfalllist):
+    """
+    Tracks from lists with the positions and landfall of every TC (as returned by TC_movement)
+
+    Parameters
+    ----------
+    latlist : list of TC track latitude positions (one list or array per TC).
+    lonlist : list of TC track longitude positions.
+    landfalllist : list of TC landfall (0=no 1=yes).
+
+    Returns
+    -------
+    tracks : Tracks.
+
+    """
+    lengths=[len(lat) for lat in latlist]
+    flat=lambda lists: np.concatenate([np.asarray(x,dtype=float) for x in lists]) if len(lists)>0 else np.zeros(0)
+    return Tracks(flat(latlist),flat(lonlist),flat(landfalllist),np.concatenate(([0],np.cumsum(lengths,dtype=np.int64))))
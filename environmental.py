@@ -20,6 +20,7 @@ from scipy.stats import norm
 from scipy.optimize import curve_fit
 import math
 import preprocessing
+from TEXT_CACHE import load_text
 import os
 import sys
 pd.options.mode.chained_assignment=None # default='warn'
@@ -210,7 +211,7 @@ def wind_pressure_relationship(idx_basin,months):
             check=check_season(idx,month) 
             #print(idx,month,check)
             if check==1:
-                MSLP=np.loadtxt(os.path.join(__location__,'Monthly_mean_MSLP_'+str(month)+'.txt'))                
+                MSLP=load_text(os.path.join(__location__,'Monthly_mean_MSLP_'+str(month)+'.txt'))                
                 for j in range(0,len(latlist[i])):
                     #Wind needs to be greater than 15 kt.                         
                         latn=np.abs(lat-latlist[i][j]).argmin()
@@ -310,8 +311,8 @@ def calculate_MPI_fields(idx_basin,months,months_for_coef,mpi_bounds):
     SST_field_all={i:[] for i in range(1,13)}
     
     for month in range(1,13):
-        MSLP_field_all[month]=np.loadtxt(os.path.join(__location__,'Monthly_mean_MSLP_'+str(month)+'.txt'))
-        SST_field_all[month]=np.loadtxt(os.path.join(__location__,'Monthly_mean_SST_'+str(month)+'.txt'))
+        MSLP_field_all[month]=load_text(os.path.join(__location__,'Monthly_mean_MSLP_'+str(month)+'.txt'))
+        SST_field_all[month]=load_text(os.path.join(__location__,'Monthly_mean_SST_'+str(month)+'.txt'))
     
     for i in range(len(latlist)):
         if len(preslist[i])>0:
@@ -505,7 +506,7 @@ def pressure_coefficients(idx_basin,months,months_for_coef):
             print(idx,m)
             
             m_coef=months_for_coef[idx][i]
-            MPI_MATRIX=np.loadtxt(os.path.join(__location__,'MPI_FIELDS_'+str(idx)+str(m)+'.txt'))
+            MPI_MATRIX=load_text(os.path.join(__location__,'MPI_FIELDS_'+str(idx)+str(m)+'.txt'))
         
             lat_df,lon_df,mpi_df=[],[],[]
             
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+The STORM modules are imported from the root of the repository
+"""
+import os
+import sys
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Check the array version of decay_after_landfall against the scalar loop it replaced
+"""
+import math
+import numpy as np
+from SAMPLE_TC_PRESSURE import decay_after_landfall,Calculate_Vmax,Calculate_Pressure
+
+def haversine_scalar(lat1,lon1,lat2,lon2):
+    lon1,lat1,lon2,lat2=map(math.radians,[lon1,lat1,lon2,lat2])
+    A1=math.sin(abs(lat2-lat1)/2)**2.+math.cos(lat1)*math.cos(lat2)*math.sin(abs(lon1-lon2)/2)**2.
+    return 2.*math.asin(math.sqrt(A1))*6371.
+
+def decay_after_landfall_scalar(lat_landfall,lon_landfall,latlijst,lonlijst,p,coef,Penv):
+    """
+    The scalar loop of Kaplan&DeMaria 1995, one time step at a time (with the stationary branch for D<=1 km)
+    """
+    C1,D1,R,t0,alpha,vb=0.0109,-0.0503,0.9,150,0.095,26.7
+    v0=Calculate_Vmax(Penv,p,coef)
+    pressure_decay=[p]
+    wind_decay=[v0]
+    v0=v0/0.5144444444
+    D0=1.
+    v=v0
+    t=3
+    j=1
+    pres_landfall=p
+    while v>35 or j<len(latlijst):
+        try:
+            D=haversine_scalar(lat_landfall,lon_landfall,latlijst[j],lonlijst[j])
+            if D<=1.:
+                pressure_decay.append(pres_landfall)
+                wind_decay.append(v0*0.5144444)
+                j=j+1
+                t=t+3
+            if D>1:
+                M=C1*t*(t0-t)
+                b_KM=D1*t*(t0-t)
+                C_KM=M*np.log(D/D0)+b_KM
+                v=vb+(R*v0-vb)*np.exp(-alpha*t)-C_KM
+                pres_landfall=round(Calculate_Pressure(v*0.514444,Penv,coef),1)
+                pressure_decay.append(pres_landfall)
+                wind_decay.append(v*0.514444)
+                if v*0.51444<18.:
+                    return pressure_decay,wind_decay
+                else:
+                    t=t+3
+                    j=j+1
+            else:
+                v=-100.
+        except IndexError:
+            v=-100.
+    return pressure_decay,wind_decay
+
+def random_segments(n,seed=0):
+    """
+    Overland track segments on the 0.1 deg grid. Some time steps are stationary (D=0), or within 1 km of the
+    landfall point (0<D<=1, e.g. a rounding difference of the landfall latitude)
+    """
+    rng=np.random.default_rng(seed)
+    segments=[]
+    for k in range(n):
+        length=rng.integers(1,60)
+        step=rng.choice([0.,0.1,0.2,0.5],size=(length,2),p=[0.2,0.3,0.3,0.2])*rng.choice([-1,1],size=(length,2))
+        step[0]=0.
+        lat=np.round(rng.uniform(-40.,40.)+np.cumsum(step[:,0]),1)
+        lon=np.round(rng.uniform(100.,260.)+np.cumsum(step[:,1]),1)
+        lat_landfall=lat[0]+rng.choice([0.,1e-13,-1e-13,0.005])
+        segments.append((lat_landfall,lon[0],lat.tolist(),lon.tolist(),round(rng.uniform(900.,1000.),1),
+                         np.array([rng.uniform(1.,4.),rng.uniform(0.5,0.8)]),rng.uniform(1005.,1015.)))
+    return segments
+
+def test_decay_matches_scalar_loop():
+    for segment in random_segments(2000):
+        pressure,wind=decay_after_landfall(*segment)
+        pressure_ref,wind_ref=decay_after_landfall_scalar(*segment)
+        assert len(pressure)==len(pressure_ref)
+        assert len(wind)==len(wind_ref)
+        #the distances of np.arcsin can differ by an ulp from math.asin, which may flip the rounding of a pressure
+        np.testing.assert_allclose(pressure,pressure_ref,rtol=0,atol=0.1+1e-9)
+        np.testing.assert_allclose(wind,wind_ref,rtol=1e-9)
+
+def test_decay_stationary_and_short_segments():
+    coef=np.array([2.5,0.7])
+    for lat,lon in [([10.],[130.]),([10.,10.],[130.,130.]),([10.,10.,10.3,10.3],[130.,130.,130.3,130.6])]:
+        pressure,wind=decay_after_landfall(lat[0]+1e-13,lon[0],lat,lon,950.,coef,1010.)
+        pressure_ref,wind_ref=decay_after_landfall_scalar(lat[0]+1e-13,lon[0],lat,lon,950.,coef,1010.)
+        assert pressure==pressure_ref
+        np.testing.assert_allclose(wind,wind_ref,rtol=1e-12)